@@ -1,10 +1,92 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
 from .models import (
-    CustomUser, Consultant_Profile, Availability,
-    Booking, Payment, Review
+    CustomUser, Consultant_Profile, Availability, AvailabilityRule,
+    Booking, Payment, Review, Job
 )
 
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Takes the row count of a big, unfiltered changelist from the table
+    statistics Postgres keeps (``pg_class.reltuples``) instead of running
+    COUNT(*) over millions of rows. Tables under ADMIN_EXACT_COUNT_LIMIT and
+    every filtered or searched list are counted exactly, since a planner
+    guess for a WHERE clause can be far off and would show pages that do
+    not exist.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.estimate()
+            if estimate is not None and estimate >= settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+    def estimate(self):
+        """
+        Rows in the whole table as of the last ANALYZE, or ``None`` off Postgres
+        or before the table was ever analyzed.
+        """
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        # Postgres 14+ reports -1 for a table that was never vacuumed or analyzed
+        return row[0] if row and row[0] >= 0 else None
+
+
+class UserSearchMixin:
+    """
+    Answers ``search_fields`` that go through a foreign key to CustomUser or
+    Consultant_Profile (``client__username``, ``consultant__user__email``)
+    without a LIKE over the joins.
+
+    Each term picks rows by their indexed foreign keys from a subquery over
+    the users whose username or email match, which the trigram indexes
+    answer. As in ModelAdmin, terms are split on whitespace (quoted phrases
+    stay whole) and every term must match.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        names = dict.fromkeys(field.split('__')[0] for field in self.search_fields)
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            users = CustomUser.objects.filter(Q(username__icontains=bit) | Q(email__icontains=bit)).values('id')
+            matches = Q()
+            for name in names:
+                if self.model._meta.get_field(name).related_model is Consultant_Profile:
+                    matches |= Q(**{f'{name}_id__in': Consultant_Profile.objects.filter(user_id__in=users).values('id')})
+                else:
+                    matches |= Q(**{f'{name}_id__in': users})
+            queryset = queryset.filter(matches)
+        return queryset, False
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables that grow to millions of rows.
+    """
+    paginator = EstimatedCountPaginator
+    # Let skip the second COUNT(*) behind "N total" on filtered pages
+    show_full_result_count = False
+    list_per_page = 50
+
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'phone_number', 'role', 'is_staff')
@@ -26,28 +108,54 @@ class AvailabilityInline(admin.TabularInline):
     model = Availability
     extra = 1
 
+class AvailabilityRuleInline(admin.TabularInline):
+    model = AvailabilityRule
+    extra = 0
+
 @admin.register(Consultant_Profile)
 class ConsultantProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'specialization', 'is_active', 'created_at')
     search_fields = ('user__username', 'specialization')
-    inlines = [AvailabilityInline]
+    inlines = [AvailabilityInline, AvailabilityRuleInline]
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(UserSearchMixin, LargeTableAdmin):
     list_display = ('client', 'consultant', 'availability', 'status', 'created_at')
-    list_filter = ('status', 'created_at')
-    search_fields = ('client__username', 'consultant__user__username')
+    # Every __str__ above walks to a user, so join them all into the page query
+    list_select_related = ('client', 'consultant__user', 'availability__consultant__user')
+    list_filter = ('status',)
+    date_hierarchy = 'created_at'
+    search_fields = ('client__username', 'client__email', 'consultant__user__username', 'consultant__user__email')
+    search_help_text = "Username or email of the client or consultant."
+    raw_id_fields = ('client', 'consultant', 'availability')
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdmin):
     list_display = ('booking', 'amount', 'status', 'payment_reference', 'paid_at')
+    list_select_related = ('booking__client', 'booking__consultant__user', 'booking__availability')
     list_filter = ('status',)
+    date_hierarchy = 'paid_at'
+    # The reference is unique, an exact match reads its index
+    search_fields = ('payment_reference__exact',)
+    raw_id_fields = ('booking',)
 
 
 # Review is actually optional
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(UserSearchMixin, LargeTableAdmin):
     list_display = ('booking', 'client', 'rating', 'comment', 'created_at')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    list_select_related = ('booking__client', 'booking__consultant__user', 'booking__availability', 'client')
+    readonly_fields = ('created_at',)
+    date_hierarchy = 'created_at'
+    search_fields = ('client__username', 'client__email', 'consultant__user__username', 'consultant__user__email')
+    search_help_text = "Username or email of the client or consultant."
+    raw_id_fields = ('booking', 'client', 'consultant')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'locked_at', 'last_error')
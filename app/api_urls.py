@@ -1,5 +1,5 @@
 from rest_framework.routers import DefaultRouter
-from .viewsets import BookingViewSet, AvailabilityViewSet
+from .viewsets import BookingViewSet, AvailabilityViewSet, ConsultantSearchViewSet, FreeWindowViewSet, MatchViewSet
 from django.urls import path, include
 
 
@@ -10,6 +10,9 @@ consultant_router.register("availabilities", AvailabilityViewSet, basename="cons
 # Client specific routes, to perform CRUD for Bookings
 client_router = DefaultRouter()
 client_router.register("bookings", BookingViewSet, basename="client-bookings")
+client_router.register("consultants", ConsultantSearchViewSet, basename="client-consultants")
+client_router.register("free-windows", FreeWindowViewSet, basename="client-free-windows")
+client_router.register("match", MatchViewSet, basename="client-match")
 
 
 urlpatterns = [
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        # Let register the background job functions, model signal handlers and the SQL counter
+        from . import metrics, signals, tasks  # noqa: F401
@@ -0,0 +1,48 @@
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect
+from .models import Payment
+from .paystack import PaystackError
+from .paystack_async import get_async_client
+from .views import _booking_payment, _check_payment, _checkout_redirect
+
+
+# Async twins of the payment views in app.views, routed when ASYNC_PAYMENTS is on.
+# The ORM work runs through sync_to_async; only the Paystack call is awaited here.
+
+
+@login_required
+async def initialize_payment(request, booking_id):
+    user = await request.auser()
+    payment = await sync_to_async(_booking_payment)(user, booking_id)
+
+    # Now let prevent user from double payment
+    if payment.status == Payment.PaymentStatus.SUCCESS:
+        return redirect("book-dashboard")
+
+    try:
+        response_data = await get_async_client().initialize(
+            email=user.email,
+            amount=payment.amount,
+            reference=payment.payment_reference,
+            callback_url=request.build_absolute_uri("/verify-payment/"),
+        )
+    except PaystackError as e:
+        messages.error(request, f"Connection Error: {str(e)}")
+        return redirect("book-dashboard")
+
+    return _checkout_redirect(request, response_data)
+
+
+@login_required
+async def verify_payment(request):
+    reference = request.GET.get("reference")
+
+    if not reference:
+        messages.error(request, "No payment reference found")
+        return redirect("book-dashboard")
+
+    user = await request.auser()
+    await sync_to_async(_check_payment)(request, user, reference)
+    return redirect("book-dashboard")
@@ -0,0 +1,166 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import Consultant_Profile
+
+
+# Version counters live in the cache next to the entries they guard.
+# Bumping a counter orphans every key built from the old value, so nothing
+# has to be found and deleted; the orphans simply expire.
+ALL = 'all'                 # bumped by the bulk management commands
+LISTINGS = 'listings'       # pages that mix many consultants (slot lists)
+
+
+def _version_key(name):
+    return f"cache-version:{name}"
+
+
+def _consultant(consultant_id):
+    return f"consultant-{consultant_id}"
+
+
+def _specialization(specialization):
+    # Matched case-insensitively, so "Tax" and "tax" share one counter
+    return f"specialization-{_digest([specialization.strip().upper()])}"
+
+
+def _fresh_version():
+    # Let start from the clock, so a counter that was evicted never comes
+    # back at a value some old entry was stored under
+    return time.time_ns()
+
+
+def _versions(*names):
+    keys = [_version_key(name) for name in names]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = _fresh_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def _bump(name):
+    key = _version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def _digest(parts):
+    raw = "|".join(str(part) for part in parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def consultant_key(consultant_id, name, *parts):
+    """
+    Cache key for data of a single consultant, dropped when that consultant
+    (or anything hanging off them) changes.
+    """
+    versions = _versions(ALL, _consultant(consultant_id))
+    return f"{name}:{consultant_id}:{_digest([*versions, *parts])}"
+
+
+def listing_key(name, *parts):
+    """
+    Cache key for a page spanning many consultants, dropped when any of them changes.
+    """
+    versions = _versions(ALL, LISTINGS)
+    return f"{name}:{_digest([*versions, *parts])}"
+
+
+def specialization_key(specialization, name, *parts):
+    """
+    Cache key for a page over the consultants of one specialization, dropped
+    when any of them changes.
+    """
+    versions = _versions(ALL, _specialization(specialization))
+    return f"{name}:{_digest([*versions, specialization.strip().upper(), *parts])}"
+
+
+def invalidate_consultants(consultant_ids, specializations=()):
+    """
+    Drop the cached data of these consultants, of their specializations and
+    every listing. ``specializations`` adds ones they no longer carry: the
+    one a profile had before an edit, or the one of a deleted profile.
+
+    The bump waits for the transaction to commit; bumping earlier would let
+    a concurrent request cache the old rows under the new version.
+    """
+    consultant_ids = {pk for pk in consultant_ids if pk is not None}
+    specializations = {specialization for specialization in specializations if specialization is not None}
+
+    def bump():
+        # Let read the current specializations here, so the write itself pays no extra query
+        names = set(specializations)
+        if consultant_ids:
+            names.update(
+                Consultant_Profile.objects.filter(pk__in=consultant_ids).values_list('specialization', flat=True)
+            )
+        for consultant_id in consultant_ids:
+            _bump(_consultant(consultant_id))
+        for name in {_specialization(specialization) for specialization in names}:
+            _bump(name)
+        _bump(LISTINGS)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_consultant(consultant_id, specializations=()):
+    invalidate_consultants([consultant_id], specializations)
+
+
+def invalidate_all():
+    transaction.on_commit(lambda: _bump(ALL))
+
+
+def get_or_build(key, build, timeout=None):
+    """
+    Return the cached value for ``key``, calling ``build()`` on a miss.
+
+    Only one caller rebuilds a key at a time (a short ``cache.add`` lock):
+    while it works, the others keep serving the expired copy, or wait up to
+    ``CACHE_LOCK_WAIT`` seconds for the first copy, instead of all running
+    the same query at once.
+    """
+    timeout = settings.CACHE_TIMEOUT if timeout is None else timeout
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            return value
+        # Stale: let one caller refresh it while the rest use the old copy
+        if not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            return value
+        return _build_and_store(key, lock_key, build, timeout)
+
+    if cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        return _build_and_store(key, lock_key, build, timeout)
+
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    # The builder is taking too long, build it here rather than fail the request
+    return build()
+
+
+def _build_and_store(key, lock_key, build, timeout):
+    try:
+        value = build()
+        # Keep the entry a little past its freshness so there is something to serve during a rebuild
+        cache.set(key, (value, time.time() + timeout), timeout + settings.CACHE_STALE_GRACE)
+        return value
+    finally:
+        cache.delete(lock_key)
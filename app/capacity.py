@@ -0,0 +1,166 @@
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .events import STATUS_CHANGED, publish
+from .models import Availability, Booking
+from .versioning import AVAILABILITIES, bump_stamps
+
+
+def _counters_changed(availability_id):
+    # Counter updates skip the model signals, so the API version stamp is bumped here
+    bump_stamps(AVAILABILITIES, Availability.objects.filter(pk=availability_id).values_list('consultant_id', flat=True))
+
+
+class SlotFull(Exception):
+    """
+    Raised when an availability has no seat left for another booking.
+    """
+    def __init__(self, message="This slot is fully booked, please pick another date."):
+        super().__init__(message)
+
+
+class WindowTaken(SlotFull):
+    """
+    Raised when the booked time overlaps another live booking of the consultant.
+    """
+    def __init__(self, message="That time is already booked, please pick another one."):
+        super().__init__(message)
+
+
+def claim_window(booking):
+    """
+    Refuse a timed booking that overlaps another live booking of the same
+    consultant. Two requests can still both pass this check; on Postgres the
+    ``booking_no_overlap`` exclusion constraint stops the second insert, see
+    ``window_constraint``.
+    """
+    if booking.start_at is None:
+        return
+    overlapping = (
+        Booking.objects
+        .filter(consultant_id=booking.consultant_id, start_at__lt=booking.end_at, end_at__gt=booking.start_at)
+        .exclude(status=Booking.StatusChoices.CANCELLED)
+        .exclude(pk=booking.pk)
+    )
+    if overlapping.exists():
+        raise WindowTaken()
+
+
+@contextmanager
+def window_constraint():
+    # Let turn a lost race on the exclusion constraint into the same error as the check
+    try:
+        yield
+    except IntegrityError as e:
+        if 'booking_no_overlap' in str(e):
+            raise WindowTaken() from e
+        raise
+
+
+def shift_confirmed_count(availability_id, delta):
+    # Let apply the change in SQL so concurrent requests never lose an update
+    Availability.objects.filter(pk=availability_id).update(
+        confirmed_count=F('confirmed_count') + delta
+    )
+    _counters_changed(availability_id)
+
+
+def claim_seat(availability_id):
+    """
+    Take one seat on an availability with a single conditional UPDATE.
+
+    The row is only touched while ``reserved_count < max_slot``, so the
+    database serialises concurrent claims and a slot can never be oversold.
+    """
+    claimed = Availability.objects.filter(
+        pk=availability_id,
+        reserved_count__lt=F('max_slot'),
+    ).update(reserved_count=F('reserved_count') + 1)
+
+    if not claimed:
+        raise SlotFull()
+    _counters_changed(availability_id)
+
+
+def release_seat(availability_id):
+    Availability.objects.filter(pk=availability_id).update(
+        reserved_count=F('reserved_count') - 1
+    )
+    _counters_changed(availability_id)
+
+
+def reserve_booking(booking):
+    """
+    Save a new (unsaved) booking only if its availability still has room.
+    """
+    with transaction.atomic():
+        claim_seat(booking.availability_id)
+        claim_window(booking)
+        with window_constraint():
+            booking.save()
+    return booking
+
+
+def set_booking_status(booking, new_status):
+    """
+    Move a booking to ``new_status`` and keep the counters of its
+    availability in step. Cancelling gives the seat back; leaving the
+    cancelled state has to claim a seat again and may raise ``SlotFull``.
+    """
+    confirmed = Booking.StatusChoices.CONFIRMED
+    cancelled = Booking.StatusChoices.CANCELLED
+
+    with transaction.atomic():
+        # Lock the row so two requests cannot both count the same transition
+        old_status = Booking.objects.select_for_update().values_list('status', flat=True).get(pk=booking.pk)
+
+        if old_status == cancelled and new_status != cancelled:
+            claim_seat(booking.availability_id)
+            # The time may have been booked by someone else while this booking was cancelled
+            claim_window(booking)
+        elif old_status != cancelled and new_status == cancelled:
+            release_seat(booking.availability_id)
+
+        booking.status = new_status
+        with window_constraint():
+            booking.save(update_fields=['status'])
+
+        if old_status != confirmed and new_status == confirmed:
+            shift_confirmed_count(booking.availability_id, 1)
+        elif old_status == confirmed and new_status != confirmed:
+            shift_confirmed_count(booking.availability_id, -1)
+
+        if old_status != new_status:
+            publish(booking.consultant_id, STATUS_CHANGED, {'id': booking.pk, 'status': new_status})
+
+    return booking
+
+
+def move_booking(booking, old_availability_id):
+    """
+    Carry a booking's seat over after its availability changed.
+    Must run inside the transaction that saved the change.
+    """
+    if booking.availability_id == old_availability_id:
+        return
+
+    if booking.status != Booking.StatusChoices.CANCELLED:
+        claim_seat(booking.availability_id)
+        release_seat(old_availability_id)
+
+    if booking.status == Booking.StatusChoices.CONFIRMED:
+        shift_confirmed_count(old_availability_id, -1)
+        shift_confirmed_count(booking.availability_id, 1)
+
+
+def delete_booking(booking):
+    """
+    Delete a booking and give its seat back.
+    """
+    with transaction.atomic():
+        old_status = Booking.objects.select_for_update().values_list('status', flat=True).get(pk=booking.pk)
+        if old_status != Booking.StatusChoices.CANCELLED:
+            release_seat(booking.availability_id)
+        if old_status == Booking.StatusChoices.CONFIRMED:
+            shift_confirmed_count(booking.availability_id, -1)
+        booking.delete()
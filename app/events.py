@@ -0,0 +1,197 @@
+import asyncio
+import json
+import select
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection, connections, transaction
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from .models import Consultant_Profile
+
+
+# Postgres NOTIFY channel carrying dashboard events between processes
+CHANNEL = 'consultant_events'
+
+BOOKING_CREATED = 'booking-created'
+STATUS_CHANGED = 'status-changed'
+PAYMENT_SUCCEEDED = 'payment-succeeded'
+
+
+class _Subscriber:
+    __slots__ = ('loop', 'queue', 'overflowed')
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, message):
+        # Runs on the subscriber's loop; a client this far behind is cut off and reconnects
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+def _offer_all(subscribers, message):
+    for subscriber in subscribers:
+        subscriber.offer(message)
+
+
+class Broker:
+    """
+    Hands every event to the open streams of its consultant in this process.
+
+    Events reach the process once, through ``publish()`` (same process) or
+    the single LISTEN connection (other processes); nothing here queries the
+    database per connected client.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._listener = None
+
+    def subscribe(self, consultant_id):
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(consultant_id, set()).add(subscriber)
+        self._start_listener()
+        return subscriber
+
+    def unsubscribe(self, consultant_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(consultant_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[consultant_id]
+
+    def dispatch(self, consultant_id, message):
+        # Thread-safe: called from the listener thread and from sync views
+        by_loop = {}
+        with self._lock:
+            for subscriber in self._subscribers.get(consultant_id, ()):
+                by_loop.setdefault(subscriber.loop, []).append(subscriber)
+        # One wake-up per event loop rather than one per open stream
+        for loop, subscribers in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_offer_all, subscribers, message)
+            except RuntimeError:
+                # That loop has been closed, its streams are gone
+                pass
+
+    def _start_listener(self):
+        if connection.vendor != 'postgresql':
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='consultant-events', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            # A connection of its own, never handed out to requests
+            wrapper = connections.create_connection('default')
+            try:
+                wrapper.ensure_connection()
+                raw = wrapper.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                while True:
+                    if select.select([raw], [], [], settings.EVENTS_HEARTBEAT) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        self._deliver(raw.notifies.pop(0).payload)
+            except Exception:
+                # Let reconnect after a dropped connection or a database restart
+                time.sleep(1)
+            finally:
+                try:
+                    wrapper.close()
+                except Exception:
+                    pass
+
+    def _deliver(self, payload):
+        try:
+            consultant_id, message = payload.split(':', 1)
+            self.dispatch(int(consultant_id), message)
+        except ValueError:
+            pass
+
+
+broker = Broker()
+
+
+def _message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def publish(consultant_id, event, data):
+    """
+    Push ``event`` to the dashboards of a consultant once the current
+    transaction commits.
+
+    On Postgres this is a NOTIFY, which the database itself holds back until
+    commit and delivers to every web process; elsewhere (SQLite for local dev)
+    only streams of this process see it.
+    """
+    message = _message(event, data)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, f"{consultant_id}:{message}"])
+    else:
+        transaction.on_commit(lambda: broker.dispatch(consultant_id, message))
+
+
+def booking_data(booking):
+    return {
+        'id': booking.id,
+        'client': booking.client.get_full_name(),
+        # NOTIFY payloads are capped at 8000 bytes, the full text is on the next page load
+        'reason': booking.reason_for_session[:200],
+        'created_at': booking.created_at.isoformat(),
+        'date': booking.availability.date.isoformat(),
+        'status': booking.status,
+        'meeting_link': booking.meeting_link or '',
+    }
+
+
+async def _stream(consultant_id):
+    subscriber = broker.subscribe(consultant_id)
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+        while not subscriber.overflowed:
+            try:
+                yield await asyncio.wait_for(subscriber.queue.get(), settings.EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": ping\n\n"
+    finally:
+        broker.unsubscribe(consultant_id, subscriber)
+
+
+@login_required
+async def consultant_events(request):
+    """
+    Server-sent events for the logged-in consultant's dashboard: new
+    bookings, status changes and successful payments.
+    """
+    # Under WSGI every open stream would hold a worker thread; 204 tells EventSource to stop retrying
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    consultant_id = await Consultant_Profile.objects.filter(user=user).values_list('id', flat=True).afirst()
+    if consultant_id is None:
+        return HttpResponseForbidden()
+
+    response = StreamingHttpResponse(_stream(consultant_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Let nginx pass events through instead of buffering them
+    response['X-Accel-Buffering'] = 'no'
+    return response
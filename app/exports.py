@@ -0,0 +1,197 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_safe
+from .models import Booking, Payment
+
+
+# (header, field) pairs read with values_list(), so no model instance is built per row
+BOOKING_COLUMNS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('date', 'availability__date'),
+    ('start_at', 'start_at'),
+    ('end_at', 'end_at'),
+    ('status', 'status'),
+    ('client', 'client__username'),
+    ('client_email', 'client__email'),
+    ('consultant', 'consultant__user__username'),
+    ('reason_for_session', 'reason_for_session'),
+    ('payment_status', 'payment__status'),
+    ('amount_naira', 'payment__amount'),
+]
+
+PAYMENT_COLUMNS = [
+    ('id', 'id'),
+    ('payment_reference', 'payment_reference'),
+    ('status', 'status'),
+    ('paid_at', 'paid_at'),
+    ('amount_naira', 'amount'),
+    ('booking', 'booking_id'),
+    ('booking_status', 'booking__status'),
+    ('client', 'booking__client__username'),
+    ('client_email', 'booking__client__email'),
+    ('consultant', 'booking__consultant__user__username'),
+]
+
+# Which timestamp the date range applies to; both are indexed
+EXPORTS = {
+    'bookings': (Booking, BOOKING_COLUMNS, 'created_at'),
+    'payments': (Payment, PAYMENT_COLUMNS, 'paid_at'),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Rows joined into one chunk of the response, so the server writes fewer, larger pieces
+ROWS_PER_WRITE = 500
+
+# Spreadsheets run a cell starting with one of these as a formula (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_queryset(kind, user=None, date_from=None, date_to=None):
+    """
+    Rows of ``kind`` ('bookings' or 'payments') visible to ``user`` (all of
+    them for staff or when ``user`` is None), as value tuples in
+    ``EXPORTS[kind]`` column order, oldest first.
+
+    ``date_from``/``date_to`` are whole days compared against the indexed
+    timestamp directly, never through a ``__date`` cast that would hide it
+    from the index.
+    """
+    model, columns, date_field = EXPORTS[kind]
+    rows = model.objects.all()
+
+    if user is not None and not user.is_staff:
+        prefix = '' if model is Booking else 'booking__'
+        if user.role == 'CONSULTANT':
+            rows = rows.filter(**{f'{prefix}consultant__user': user})
+        else:
+            rows = rows.filter(**{f'{prefix}client': user})
+
+    tz = timezone.get_current_timezone()
+    if date_from:
+        rows = rows.filter(**{f'{date_field}__gte': datetime.combine(date_from, time.min, tz)})
+    if date_to:
+        rows = rows.filter(**{f'{date_field}__lt': datetime.combine(date_to + timedelta(days=1), time.min, tz)})
+
+    return rows.order_by(date_field, 'id').values_list(*[field for header, field in columns])
+
+
+def _cell(header, value):
+    if header == 'amount_naira' and value is not None:
+        return value / 100
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    # csv.writer wants a file; this one hands the formatted line straight back
+    def write(self, value):
+        return value
+
+
+def _csv_cell(header, value):
+    value = _cell(header, value)
+    # Let a client's text such as "=HYPERLINK(...)" open as plain text
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_csv_cell(header, value) for header, value in zip(headers, row)])
+
+
+def _jsonl_lines(headers, rows):
+    for row in rows:
+        record = {header: _cell(header, value) for header, value in zip(headers, row)}
+        yield json.dumps(record, default=str) + '\n'
+
+
+def export_lines(kind, fmt, rows):
+    """
+    Lines of a CSV or JSONL export, read from the database
+    ``EXPORT_CHUNK_SIZE`` rows at a time (a server-side cursor on Postgres),
+    so memory stays flat however many rows there are.
+    """
+    headers = [header for header, field in EXPORTS[kind][1]]
+    rows = rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    if fmt == 'csv':
+        return _csv_lines(headers, rows)
+    return _jsonl_lines(headers, rows)
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+async def _async_batches(batches):
+    # Under ASGI a sync iterator is read into a list before the first byte goes out;
+    # pull one batch at a time on the request's sync thread instead
+    read = sync_to_async(next)
+    try:
+        while True:
+            batch = await read(batches, None)
+            if batch is None:
+                return
+            yield batch
+    finally:
+        # Closes the database cursor when the client goes away mid-download
+        await sync_to_async(batches.close)()
+
+
+def _date_param(request, name):
+    # Let ignore malformed dates instead of failing the download
+    try:
+        return parse_date(request.GET.get(name) or '')
+    except ValueError:
+        return None
+
+
+@require_safe
+@login_required
+def export_records(request, kind, fmt):
+    """
+    Download every booking or payment the user can see as CSV or JSONL,
+    streamed as it is read. ``?date_from=``/``?date_to=`` (YYYY-MM-DD)
+    narrow it by booking creation or payment date.
+    """
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise Http404("Unknown export")
+
+    date_from = _date_param(request, 'date_from')
+    date_to = _date_param(request, 'date_to')
+    rows = export_queryset(kind, request.user, date_from, date_to)
+
+    content = _batched(export_lines(kind, fmt, rows))
+    if isinstance(request, ASGIRequest):
+        content = _async_batches(content)
+
+    response = StreamingHttpResponse(content, content_type=FORMATS[fmt])
+    stamp = timezone.localdate().isoformat()
+    response['Content-Disposition'] = f'attachment; filename="{kind}-{stamp}.{fmt}"'
+    # Let nginx send rows on as they come instead of buffering the whole file
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,7 +1,9 @@
+from datetime import datetime
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import CustomUser, Consultant_Profile, Availability, Booking, Payment, Review
+from .models import CustomUser, Consultant_Profile, Availability, AvailabilityRule, Booking, Payment, Review
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.forms import inlineformset_factory
 
 
@@ -39,9 +41,11 @@ class AvailabilityForm(forms.ModelForm):
 
     class Meta:
         model = Availability
-        fields = ('date', 'max_slot',)
+        fields = ('date', 'start_time', 'end_time', 'max_slot',)
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'}),
+            'start_time': forms.TimeInput(attrs={'type': 'time'}),
+            'end_time': forms.TimeInput(attrs={'type': 'time'}),
         }
 
 # This creates a group of forms for the Availability model
@@ -53,12 +57,54 @@ AvailabilityFormSet = forms.inlineformset_factory(
     can_delete=True # Allows consultants to remove a date
 )
 
+class AvailabilityRuleForm(forms.ModelForm):
+    # Let pick the weekdays with checkboxes and store them as a bit mask
+    days = forms.TypedMultipleChoiceField(
+        choices=AvailabilityRule.WEEKDAY_CHOICES,
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        model = AvailabilityRule
+        fields = ('start_date', 'end_date', 'start_time', 'end_time', 'max_slot',)
+        widgets = {
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'type': 'date'}),
+            'start_time': forms.TimeInput(attrs={'type': 'time'}),
+            'end_time': forms.TimeInput(attrs={'type': 'time'}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise ValidationError("The end date must be on or after the start date.")
+        return cleaned_data
+
+    def save(self, commit=True):
+        self.instance.weekdays = sum(1 << day for day in self.cleaned_data['days'])
+        return super().save(commit)
+
+
 class BookingForm(forms.ModelForm):
+    start_at = forms.TypedChoiceField(label="Start time", coerce=datetime.fromisoformat)
 
     class Meta:
         model = Booking
         fields = ('reason_for_session',)
 
+    def __init__(self, *args, windows=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Let offer the free windows of days with working hours; whole days have no time to pick
+        if windows is None:
+            del self.fields['start_at']
+        else:
+            self.fields['start_at'].choices = [
+                (start.isoformat(), timezone.localtime(start).strftime('%H:%M')) for start, end in windows
+            ]
+
 class PaymentForm(forms.ModelForm):
 
     class Meta:
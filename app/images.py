@@ -0,0 +1,110 @@
+import hashlib
+import io
+import os
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from .models import CustomUser
+
+
+# Square avatar sizes (pixels) generated for every profile picture
+AVATAR_SIZES = (64, 128, 256)
+# Longest side of the cleaned full-size copy that replaces the upload
+MAX_ORIGINAL_SIZE = 1024
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _encode(image, fmt):
+    pil_format, options = VARIANT_FORMATS[fmt]
+    buffer = io.BytesIO()
+    # Saving a fresh image without passing exif= drops every EXIF tag (GPS, camera, ...)
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _save(name, data):
+    return default_storage.save(name, ContentFile(data))
+
+
+def picture_files(user):
+    """
+    Storage names of ``user``'s profile picture and all of its variants.
+    """
+    files = [user.profile_picture.name] if user.profile_picture else []
+    for formats in (user.profile_picture_variants or {}).values():
+        files.extend(formats.values())
+    return files
+
+
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def process_profile_picture(user_id, picture):
+    """
+    Replace an uploaded profile picture with an EXIF-free copy and build the
+    square WebP/JPEG variants listed in ``AVATAR_SIZES``.
+
+    ``picture`` is the upload this job was queued for; if the user has uploaded
+    another picture since, the job does nothing.
+    """
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if user is None or user.profile_picture.name != picture:
+        return
+
+    with default_storage.open(picture, 'rb') as f:
+        raw = f.read()
+
+    image = Image.open(io.BytesIO(raw))
+    # Let apply the camera rotation before the EXIF data carrying it is dropped
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    # Content-hashed names never change, so they can be served with immutable cache headers
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    folder = os.path.dirname(picture)
+
+    original = image.copy()
+    original.thumbnail((MAX_ORIGINAL_SIZE, MAX_ORIGINAL_SIZE))
+    clean_name = _save(f"{folder}/{digest}.jpg", _encode(original, 'jpeg'))
+
+    variants = {}
+    for size in AVATAR_SIZES:
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        variants[str(size)] = {
+            fmt: _save(f"{folder}/variants/{digest}-{size}.{'jpg' if fmt == 'jpeg' else fmt}", _encode(square, fmt))
+            for fmt in VARIANT_FORMATS
+        }
+
+    # Let only swap the files in if the picture did not change while we worked
+    updated = CustomUser.objects.filter(pk=user_id, profile_picture=picture).update(
+        profile_picture=clean_name,
+        profile_picture_variants=variants,
+    )
+    if updated:
+        if clean_name != picture:
+            default_storage.delete(picture)
+    else:
+        delete_files([clean_name] + [path for files in variants.values() for path in files.values()])
+
+
+def avatar_url(user, size, fmt='webp'):
+    """
+    URL of the smallest variant at least ``size`` pixels wide, falling back
+    to the largest variant and then to the uploaded file while processing.
+    Templates render both formats through ``{% avatar_picture %}``.
+    """
+    if not user.profile_picture:
+        return ''
+
+    variants = user.profile_picture_variants or {}
+    sizes = sorted(int(s) for s in variants)
+    if not sizes:
+        return user.profile_picture.url
+
+    chosen = next((s for s in sizes if s >= size), sizes[-1])
+    return default_storage.url(variants[str(chosen)][fmt])
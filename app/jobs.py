@@ -0,0 +1,138 @@
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(name):
+    """
+    Register a function so it can be queued by ``name``::
+
+        @job('send_receipt')
+        def send_receipt(payment_id):
+            ...
+    """
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def enqueue(name, run_after=None, max_attempts=None, **payload):
+    """
+    Queue ``name`` to run with ``payload`` as keyword arguments.
+
+    The row is written with the caller's transaction, so a job queued inside
+    an ``atomic()`` block that later rolls back is never run. Requests are
+    not atomic by themselves (no ``ATOMIC_REQUESTS``); wrap the write and the
+    ``enqueue`` together when they must stand or fall as one.
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown job: {name}")
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_once(name, **payload):
+    """
+    Like ``enqueue``, but do nothing while a job of ``name`` with the same
+    payload is still waiting or running. Returns the new job or ``None``.
+    """
+    pending = Job.objects.filter(
+        name=name,
+        payload=payload,
+        status__in=[Job.StatusChoices.QUEUED, Job.StatusChoices.RUNNING],
+    )
+    if pending.exists():
+        return None
+    return enqueue(name, **payload)
+
+
+def claim_next():
+    """
+    Lock and mark as running the oldest job that is due, or return ``None``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status=Job.StatusChoices.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+
+        if connection.features.has_select_for_update_skip_locked:
+            # Postgres: workers skip rows another worker already holds instead of queueing behind them
+            job_row = due.select_for_update(skip_locked=True).first()
+        else:
+            # SQLite has no row locks, the conditional UPDATE below decides who wins
+            job_row = due.first()
+
+        if job_row is None:
+            return None
+
+        claimed = Job.objects.filter(pk=job_row.pk, status=Job.StatusChoices.QUEUED).update(
+            status=Job.StatusChoices.RUNNING,
+            locked_at=now,
+            attempts=job_row.attempts + 1,
+        )
+        if not claimed:
+            return None
+
+    job_row.status = Job.StatusChoices.RUNNING
+    job_row.locked_at = now
+    job_row.attempts += 1
+    return job_row
+
+
+def run_job(job_row):
+    func = _registry.get(job_row.name)
+    try:
+        if func is None:
+            raise LookupError(f"No function registered for job '{job_row.name}'")
+        func(**job_row.payload)
+    except Exception:
+        job_row.last_error = traceback.format_exc()
+        if job_row.attempts >= job_row.max_attempts:
+            # Dead-letter: keep the row and its error for inspection in the admin
+            job_row.status = Job.StatusChoices.DEAD
+            logger.error("Job %s #%s is dead after %s attempts", job_row.name, job_row.pk, job_row.attempts)
+        else:
+            delay = settings.JOBS_RETRY_BACKOFF * (2 ** (job_row.attempts - 1))
+            job_row.status = Job.StatusChoices.QUEUED
+            job_row.run_after = timezone.now() + timedelta(seconds=delay)
+    else:
+        job_row.status = Job.StatusChoices.DONE
+        job_row.last_error = ''
+
+    job_row.locked_at = None
+    job_row.save(update_fields=['status', 'run_after', 'locked_at', 'last_error'])
+
+
+def work_once():
+    """
+    Run a single due job. Returns ``False`` when the queue was empty.
+    """
+    job_row = claim_next()
+    if job_row is None:
+        return False
+    run_job(job_row)
+    return True
+
+
+def requeue_stale():
+    """
+    Put back jobs left RUNNING by a worker that died mid-job.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    return Job.objects.filter(status=Job.StatusChoices.RUNNING, locked_at__lt=cutoff).update(
+        status=Job.StatusChoices.QUEUED,
+        locked_at=None,
+    )
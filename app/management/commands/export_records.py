@@ -0,0 +1,45 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from app.exports import EXPORTS, FORMATS, export_lines, export_queryset
+
+
+def _date(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class Command(BaseCommand):
+    help = "Stream all bookings or payments to a CSV or JSONL file, in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', dest='fmt', default='csv', choices=sorted(FORMATS))
+        parser.add_argument('--from', dest='date_from', type=_date, help="First day (YYYY-MM-DD), inclusive.")
+        parser.add_argument('--to', dest='date_to', type=_date, help="Last day (YYYY-MM-DD), inclusive.")
+        parser.add_argument('--output', '-o', help="File to write, stdout when left out.")
+
+    def handle(self, *args, **options):
+        kind, fmt = options['kind'], options['fmt']
+        rows = export_queryset(kind, date_from=options['date_from'], date_to=options['date_to'])
+
+        try:
+            out = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        except OSError as e:
+            raise CommandError(str(e))
+
+        count = 0
+        try:
+            for line in export_lines(kind, fmt, rows):
+                out.write(line)
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if options['output']:
+            # The CSV header line is not a row
+            rows_written = count - 1 if fmt == 'csv' else count
+            self.stderr.write(self.style.SUCCESS(f"Exported {rows_written} {kind} to {options['output']}"))
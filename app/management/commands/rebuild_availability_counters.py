@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from app.caching import invalidate_all
+from app.models import Availability, Booking
+from app.versioning import AVAILABILITIES, bump_stamps
+
+
+def _count_bookings(bookings):
+    return (
+        bookings
+        .filter(availability=OuterRef('pk'))
+        .order_by()
+        .values('availability')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+
+
+class Command(BaseCommand):
+    help = "Recompute Availability.reserved_count and confirmed_count from the bookings table."
+
+    def handle(self, *args, **options):
+        reserved = _count_bookings(Booking.objects.exclude(status=Booking.StatusChoices.CANCELLED))
+        confirmed = _count_bookings(Booking.objects.filter(status=Booking.StatusChoices.CONFIRMED))
+
+        # One UPDATE for the whole table, no rows are loaded into Python
+        updated = Availability.objects.update(
+            reserved_count=Coalesce(Subquery(reserved), 0),
+            confirmed_count=Coalesce(Subquery(confirmed), 0),
+        )
+        bump_stamps(AVAILABILITIES, Availability.objects.values_list('consultant_id', flat=True).distinct())
+        invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {updated} availability slots."))
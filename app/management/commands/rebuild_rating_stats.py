@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from app.caching import invalidate_all
+from app.models import Consultant_Profile, Review
+from app.versioning import PROFILES, bump_stamp
+
+
+def _aggregate(expression):
+    return Coalesce(Subquery(
+        Review.objects
+        .filter(consultant=OuterRef('pk'))
+        .order_by()
+        .values('consultant')
+        .annotate(value=expression)
+        .values('value')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating count, sum and histogram of every consultant profile."
+
+    def handle(self, *args, **options):
+        # One UPDATE for the whole table, no rows are loaded into Python
+        updated = Consultant_Profile.objects.update(
+            rating_count=_aggregate(Count('id')),
+            rating_sum=_aggregate(Sum('rating')),
+            **{
+                f'rating_{stars}': _aggregate(Count('id', filter=Q(rating=stars)))
+                for stars in range(1, 6)
+            },
+        )
+        # The UPDATE skips the profile signals, so expanded consultants need the stamp moved here
+        bump_stamp(PROFILES, 0)
+        invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating stats for {updated} consultant profiles."))
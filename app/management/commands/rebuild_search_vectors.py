@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from app.models import Consultant_Profile
+from app.search import is_postgres, refresh_search_vector
+
+
+class Command(BaseCommand):
+    help = "Recompute the full-text search document of every consultant profile."
+
+    def handle(self, *args, **options):
+        if not is_postgres():
+            self.stdout.write("Full-text search vectors are only used on Postgres, nothing to do.")
+            return
+
+        rebuilt = 0
+        for profile in Consultant_Profile.objects.select_related('user').iterator(chunk_size=1000):
+            refresh_search_vector(profile)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for {rebuilt} profiles."))
@@ -0,0 +1,103 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from app.models import Payment
+from app.payments import apply_outcome
+from app.paystack import PaystackClient, PaystackError
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Verify pending payments with Paystack in parallel and settle them in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Payments verified and written per transaction.")
+        parser.add_argument('--workers', type=int, default=16,
+                            help="Concurrent Paystack verify calls.")
+        parser.add_argument('--older-than', type=int, default=30,
+                            help="Only check bookings created at least this many minutes ago.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        client = PaystackClient(pool_size=options['workers'])
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+
+        pending = (
+            Payment.objects
+            .filter(status=Payment.PaymentStatus.PENDING, booking__created_at__lte=cutoff)
+            .order_by('id')
+            .values_list('id', 'payment_reference')
+        )
+
+        self.stats = Counter()
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            # Let stream the pending rows so memory stays flat however many there are
+            for batch in _chunks(pending.iterator(chunk_size=batch_size), batch_size):
+                results = pool.map(lambda row: (row[0], self._verify(client, row[1])), batch)
+                self._apply(dict(results))
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{self.stats['checked']} checked, {self.stats['confirmed']} confirmed, "
+                    f"{self.stats['failed']} failed, {self.stats['errors']} errors "
+                    f"({self.stats['checked'] / elapsed:.1f} payments/s)"
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {self.stats['checked']} payments in {elapsed:.1f}s: "
+            f"{self.stats['confirmed']} confirmed, {self.stats['failed']} failed, "
+            f"{self.stats['unchanged']} still pending, {self.stats['errors']} errors."
+        ))
+
+    def _verify(self, client, reference):
+        try:
+            response_data = client.verify(reference)
+        except PaystackError:
+            return None
+        if not response_data.get("status"):
+            return {}
+        return response_data["data"]
+
+    def _apply(self, results):
+        self.stats['checked'] += len(results)
+        self.stats['errors'] += sum(1 for data in results.values() if data is None)
+
+        settled = {
+            pk: data for pk, data in results.items()
+            if data and data.get("status") in ("success", "failed")
+        }
+        self.stats['unchanged'] += len(results) - len(settled) - sum(1 for data in results.values() if data is None)
+        if not settled:
+            return
+
+        with transaction.atomic():
+            payments = (
+                Payment.objects.select_for_update()
+                .filter(pk__in=settled, status=Payment.PaymentStatus.PENDING)
+                .order_by('id')
+            )
+            for payment in payments:
+                data = settled[payment.pk]
+                # A missing amount counts as under-paid here, the verify response always carries one
+                status = apply_outcome(
+                    payment,
+                    succeeded=data["status"] == "success",
+                    amount=int(data.get("amount") or 0),
+                    paid_at=parse_datetime(data.get("paid_at") or ""),
+                )
+                self.stats['confirmed' if status == Payment.PaymentStatus.SUCCESS else 'failed'] += 1
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from app.paystack_stub import make_stub_server
+
+
+class Command(BaseCommand):
+    help = "Run a local stand-in for the Paystack API (set PAYSTACK_BASE_URL to its address)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before every response.")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests answered with HTTP 503.")
+        parser.add_argument('--verify-status', default='success', choices=['success', 'failed', 'abandoned'])
+        parser.add_argument('--verbose', action='store_true')
+
+    def handle(self, *args, **options):
+        server = make_stub_server(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+            verify_status=options['verify_status'],
+            verbose=options['verbose'],
+        )
+        host, port = server.server_address
+        self.stdout.write(self.style.SUCCESS(f"Stub Paystack listening on http://{host}:{port}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
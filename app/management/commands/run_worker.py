@@ -0,0 +1,66 @@
+import signal
+import threading
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from app.jobs import requeue_stale, work_once
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the Job table until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+                            help="Number of jobs run in parallel by this process.")
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--burst', action='store_true',
+                            help="Exit once the queue is empty instead of waiting for more jobs.")
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        # Let warn that profile pictures processed here would land on this machine's disk only
+        if isinstance(default_storage, FileSystemStorage) and not settings.MEDIA_ROOT_SHARED:
+            self.stdout.write(self.style.WARNING(
+                f"Media is stored in the local MEDIA_ROOT ({settings.MEDIA_ROOT}). Unless the web process "
+                "shares it, set MEDIA_STORAGE_BACKEND or mount a shared volume and set MEDIA_ROOT_SHARED=true."
+            ))
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+        concurrency = max(options['concurrency'], 1)
+        self.stdout.write(self.style.SUCCESS(f"Worker started with concurrency {concurrency}."))
+
+        threads = [
+            threading.Thread(target=self._loop, args=(options['poll_interval'], options['burst']))
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            # Let the main thread wake up for signals while the workers run
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+    def _loop(self, poll_interval, burst):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                if work_once():
+                    continue
+                if burst:
+                    break
+                self.stopping.wait(poll_interval)
+        finally:
+            # Every thread has its own database connection
+            connection.close()
+
+    def _stop(self, signum, frame):
+        self.stdout.write("Stopping worker after the current jobs finish...")
+        self.stopping.set()
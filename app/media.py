@@ -0,0 +1,146 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+
+# Names written by app.images (``<sha256[:16]>.jpg``, ``<sha256[:16]>-128.webp``)
+# never change content, so browsers may keep them forever
+HASHED_NAME = re.compile(r'^[0-9a-f]{16}(-\d+)?\.\w+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def _cache_control(path):
+    if HASHED_NAME.match(os.path.basename(path)):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+
+def _parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single ``bytes=`` range, ``None``
+    to send the whole file, or ``False`` when the range cannot be satisfied.
+    """
+    match = RANGE_HEADER.match(header.strip())
+    # Multi-range and other units are optional in HTTP, so just send the whole file
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        # Nothing to send from an empty file; a 0-byte suffix is unsatisfiable too
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(path, relative_path):
+    # Let the front server (nginx / Apache) do the transfer and free this worker at once
+    response = HttpResponse()
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header.lower() == 'x-accel-redirect':
+        response[header] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative_path)
+    else:
+        response[header] = path
+    # The front server works out the real type, size and ranges itself
+    del response['Content-Type']
+    return response
+
+
+def _file_response(request, full_path, size, etag):
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.method == 'GET':
+        # If-Range: only honour the range while the client's copy is still current
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == etag:
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'))
+    else:
+        start, end = byte_range
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, end),
+            status=206,
+            content_type=content_type or 'application/octet-stream',
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = str(end - start + 1)
+
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from ``MEDIA_ROOT`` with ETag / Last-Modified validators and
+    long-lived cache headers for content-hashed names.
+
+    With ``MEDIA_SENDFILE_HEADER`` set the transfer is handed to the front
+    server; otherwise the file is streamed here, honouring single byte ranges.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+
+    # Let answer If-None-Match / If-Modified-Since with a 304 before touching the file
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if settings.MEDIA_SENDFILE_HEADER:
+            response = _sendfile_response(full_path, path)
+        else:
+            response = _file_response(request, full_path, stat.st_size, etag)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = _cache_control(path)
+    return response
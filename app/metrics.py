@@ -0,0 +1,251 @@
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+# Upper bounds (seconds) of the request latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stats of the request being handled in this thread / task
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class _RequestStats:
+    __slots__ = ('sql_count', 'sql_seconds', 'http_seconds')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.http_seconds = 0.0
+
+
+class _Registry:
+    """
+    Per-process totals, written to ``METRICS_DIR/metrics-<pid>.json`` every
+    few seconds so the /metrics view can add up all gunicorn workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(self._empty)
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def _empty():
+        return {
+            'buckets': [0] * len(LATENCY_BUCKETS),
+            'count': 0,
+            'seconds': 0.0,
+            'sql_count': 0,
+            'sql_seconds': 0.0,
+            'http_seconds': 0.0,
+        }
+
+    def observe(self, view, seconds, stats):
+        with self._lock:
+            entry = self._views[view]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    entry['buckets'][i] += 1
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['sql_count'] += stats.sql_count
+            entry['sql_seconds'] += stats.sql_seconds
+            entry['http_seconds'] += stats.http_seconds
+
+            due = time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            snapshot = json.dumps(self._views)
+            self._last_flush = time.monotonic()
+
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f"metrics-{os.getpid()}.json")
+        # Let write then rename so the /metrics view never reads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, path)
+
+
+registry = _Registry()
+
+
+def observe_http(seconds):
+    """
+    Add outbound HTTP time (e.g. a Paystack call) to the current request.
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.http_seconds += seconds
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_count += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def count_queries(sender, connection, **kwargs):
+    """
+    Put ``_sql_wrapper`` on every database connection as it opens.
+
+    Connections are per thread, and under ASGI the ORM work of a request
+    runs on sync_to_async's thread rather than the event loop's, so a
+    wrapper installed by the middleware around the request would never see
+    it. The stats follow the request's context onto whichever thread runs
+    the query.
+    """
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL query count/time and outbound HTTP time for every
+    request, grouped by the resolved URL name.
+
+    Works in both modes, so under ASGI it does not push every request
+    (and the async payment views) back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self._observe(request, started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = _RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            # sync_to_async carries the context over, so queries on its thread's connection still count here
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self._observe(request, started, stats)
+        return response
+
+    def _observe(self, request, started, stats):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unresolved'
+        registry.observe(view, time.perf_counter() - started, stats)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        return True
+    return True
+
+
+def _expired(path):
+    # A worker that was killed or restarted leaves its file behind; its totals must not count forever
+    try:
+        pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+        stale = time.time() - os.path.getmtime(path) > settings.METRICS_STALE_AFTER
+    except (ValueError, OSError):
+        return True
+    return stale or not _alive(pid)
+
+
+def _collect():
+    totals = defaultdict(_Registry._empty)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        if _expired(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as f:
+                views = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for view, entry in views.items():
+            total = totals[view]
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+            for key in ('count', 'seconds', 'sql_count', 'sql_seconds', 'http_seconds'):
+                total[key] += entry[key]
+    return totals
+
+
+def render_prometheus(totals):
+    lines = [
+        '# HELP app_request_duration_seconds Request latency by view.',
+        '# TYPE app_request_duration_seconds histogram',
+    ]
+    for view, entry in sorted(totals.items()):
+        for bound, count in zip(LATENCY_BUCKETS, entry['buckets']):
+            lines.append(f'app_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+        lines.append(f'app_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {entry["count"]}')
+        lines.append(f'app_request_duration_seconds_sum{{view="{view}"}} {entry["seconds"]:.6f}')
+        lines.append(f'app_request_duration_seconds_count{{view="{view}"}} {entry["count"]}')
+
+    for name, key, help_text in (
+        ('app_request_sql_queries_total', 'sql_count', 'SQL queries run by view.'),
+        ('app_request_sql_seconds_total', 'sql_seconds', 'Time spent in SQL by view.'),
+        ('app_request_http_seconds_total', 'http_seconds', 'Time spent on outbound HTTP (Paystack) by view.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for view, entry in sorted(totals.items()):
+            lines.append(f'{name}{{view="{view}"}} {entry[key]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    # Let allow the scraper through with a bearer token, or staff from the browser
+    token = settings.METRICS_TOKEN
+    if token:
+        if request.headers.get('Authorization') != f"Bearer {token}":
+            return HttpResponseForbidden()
+    elif not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    registry.flush()
+    return HttpResponse(render_prometheus(_collect()), content_type='text/plain; version=0.0.4')
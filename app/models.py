@@ -1,7 +1,34 @@
-from django.db import models
+from django.db import models, connections
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeBoundary, RangeOperators
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import F, Func, OuterRef, Q, Subquery
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 import uuid
+from datetime import timedelta
+
+
+class PostgresGinIndex(GinIndex):
+    """
+    GinIndex over expressions with an operator class, built as a plain index
+    of the bare expressions on other databases (SQLite for local checks),
+    which know neither GIN nor ``gin_trgm_ops``.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            expressions = [
+                expression.get_source_expressions()[0] if isinstance(expression, OpClass) else expression
+                for expression in self.expressions
+            ]
+            return models.Index(*expressions, name=self.name).create_sql(model, schema_editor, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
 
 
 # Let create model that handle users both client and consultant details
@@ -16,6 +43,8 @@ class CustomUser(AbstractUser):
     role = models.CharField(max_length=20, choices=Role.choices, default=Role.CLIENT)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     profile_picture = models.ImageField(upload_to="upload/profile_picture", null=True, blank=True)
+    # {"<size>": {"webp": path, "jpeg": path}}, filled by app.images once the upload is processed
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     SECURITY_QUESTIONS = [
         ('pet', "What was the name of your first pet?"),
@@ -24,6 +53,13 @@ class CustomUser(AbstractUser):
     ]
     security_question = models.CharField(max_length=255, choices=SECURITY_QUESTIONS, blank=True, null=True)
     security_answer = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # pg_trgm indexes matching the UPPER(...) LIKE of icontains, for the admin user searches
+            PostgresGinIndex(OpClass(Upper('username'), name='gin_trgm_ops'), name='user_username_trgm'),
+            PostgresGinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='user_email_trgm'),
+        ]
     
     def check_security_answer(self, raw_answer):
         # We lowercase and strip to avoid "Cat" vs "cat" issues
@@ -53,31 +89,195 @@ class Consultant_Profile(models.Model):
     bio = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Weighted name/specialization/bio document, refreshed by app.search on save (Postgres only)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Rating aggregates kept in step by app.ratings when reviews are added or removed
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='profile_search_idx'),
+            # pg_trgm index for typo-tolerant matches on the expertise
+            GinIndex(fields=['specialization'], name='profile_specialization_trgm', opclasses=['gin_trgm_ops']),
+            # Exact, case-insensitive topic lookups (specialization__iexact) of the matching API
+            models.Index(Upper('specialization'), F('is_active'), name='profile_specialization_idx'),
+        ]
 
     def __str__(self):
         if self.user:
             return f"{self.user.username} ({self.specialization})"
         return f"Profile ID {self.id} (No User Linked)"
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def rating_histogram(self):
+        # Let return (stars, count) pairs from 5 down to 1 for the dashboard bars
+        return [(stars, getattr(self, f'rating_{stars}')) for stars in range(5, 0, -1)]
     
 
+class AvailabilityQuerySet(models.QuerySet):
+
+    def next_per_consultant(self, from_date):
+        """
+        Earliest availability on or after ``from_date`` for every consultant,
+        picked inside the database and ordered by date.
+        """
+        upcoming = self.filter(date__gte=from_date)
+
+        if connections[self.db].features.can_distinct_on_fields:
+            # Postgres: DISTINCT ON walks the (consultant, date) index once per consultant
+            first_slots = upcoming.order_by('consultant_id', 'date').distinct('consultant_id')
+            return self.filter(id__in=first_slots.values('id')).order_by('date')
+
+        # Other backends (SQLite for local dev) fall back to a correlated subquery
+        first_slot = upcoming.filter(consultant=OuterRef('consultant')).order_by('date').values('id')[:1]
+        return upcoming.filter(id=Subquery(first_slot)).order_by('date')
+
+
+def check_working_hours(slot):
+    # Let accept whole days (no hours) or a start before the end, nothing in between
+    if (slot.start_time is None) != (slot.end_time is None):
+        raise ValidationError("Give both a start and an end time, or neither for a whole day.")
+    if slot.start_time is not None and slot.end_time <= slot.start_time:
+        raise ValidationError("The end time must be after the start time.")
+
+
+class AvailabilityRule(models.Model):
+    """
+    A recurring availability such as "Mon-Fri, max 8, until Dec 31".
+
+    Its dates are worked out on demand; an Availability row is only created
+    the first time a client books one of them (see app.recurrence).
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Mon'), (1, 'Tue'), (2, 'Wed'), (3, 'Thu'), (4, 'Fri'), (5, 'Sat'), (6, 'Sun'),
+    ]
+
+    consultant = models.ForeignKey(Consultant_Profile, on_delete=models.CASCADE, related_name='availability_rules')
+    # Bit mask of date.weekday() values: Monday = 1, Tuesday = 2, ... Sunday = 64
+    weekdays = models.PositiveSmallIntegerField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+    # Working hours of every date of the rule, copied onto the Availability row it becomes
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    max_slot = models.PositiveIntegerField(default=10)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # The dashboard only reads rules that have not ended yet
+        indexes = [models.Index(fields=['end_date'], name='availability_rule_end_idx')]
+
+    @property
+    def weekday_list(self):
+        return [day for day, _ in self.WEEKDAY_CHOICES if self.weekdays & (1 << day)]
+
+    def clean(self):
+        check_working_hours(self)
+
+    def occurs_on(self, day):
+        return self.start_date <= day <= self.end_date and bool(self.weekdays & (1 << day.weekday()))
+
+    def dates(self, start, end):
+        """
+        Dates of this rule between ``start`` and ``end`` (both included).
+        """
+        day = max(start, self.start_date)
+        last = min(end, self.end_date)
+        while day <= last:
+            if self.weekdays & (1 << day.weekday()):
+                yield day
+            day += timedelta(days=1)
+
+    def __str__(self):
+        days = ", ".join(label for day, label in self.WEEKDAY_CHOICES if day in self.weekday_list)
+        return f"{self.consultant.user.username} - {days} until {self.end_date} ({self.max_slot} max)"
+
+
 class Availability(models.Model):
     consultant = models.ForeignKey(Consultant_Profile, on_delete=models.CASCADE, related_name='availabilities')
     date = models.DateField()
     max_slot = models.PositiveIntegerField(default=10)
+    # Set when the row was created from a recurring rule on its first booking
+    rule = models.ForeignKey(AvailabilityRule, on_delete=models.SET_NULL, null=True, blank=True, related_name='availabilities')
+    # Working hours, cut into bookable windows by app.timeslots; a day without hours is booked as a whole
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    # Both counters are kept in step by app.capacity:
+    # reserved_count holds a seat for every booking that is not cancelled,
+    # confirmed_count follows bookings entering or leaving CONFIRMED
+    reserved_count = models.PositiveIntegerField(default=0, editable=False)
+    confirmed_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = AvailabilityQuerySet.as_manager()
+
     class Meta:
+        # The unique index on (consultant, date) is also what next_per_consultant() scans
         unique_together = ('consultant', 'date')
+        indexes = [
+            # Free-window search walks the days of many consultants in (date, start) order
+            models.Index(fields=['date', 'start_time'], name='availability_day_start_idx'),
+        ]
+
+    def clean(self):
+        check_working_hours(self)
 
     def is_full(self):
-        # Let count how many confirmed bookings exist for this specific availability record
-        return self.bookings.filter(status='CONFIRMED').count() >= self.max_slot
+        # Let read the maintained counter instead of counting bookings on every call
+        return self.reserved_count >= self.max_slot
+
+    @property
+    def remaining_slots(self):
+        return max(self.max_slot - self.reserved_count, 0)
 
     def __str__(self):
         return f"{self.consultant.user.username} - {self.date} ({self.max_slot} max)"
 
 
 
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+class PostgresExclusionConstraint(ExclusionConstraint):
+    """
+    ExclusionConstraint that is skipped on other databases (SQLite for local
+    checks), where EXCLUDE USING gist does not exist.
+    """
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, model, instance, exclude=None, using='default'):
+        if connections[using].vendor == 'postgresql':
+            super().validate(model, instance, exclude=exclude, using=using)
+
+
 class Booking(models.Model):
     class StatusChoices(models.TextChoices):
         PENDING = 'pending', 'Pending'
@@ -100,6 +300,9 @@ class Booking(models.Model):
         on_delete=models.CASCADE,
         related_name='bookings'
         )
+    # The booked window inside the availability's working hours; empty for whole-day availabilities
+    start_at = models.DateTimeField(null=True, blank=True)
+    end_at = models.DateTimeField(null=True, blank=True)
     reason_for_session = models.TextField()
     meeting_platform = models.CharField(max_length=50, blank=True, null=True)
     meeting_link = models.URLField(max_length=255, blank=True, null=True)
@@ -110,7 +313,26 @@ class Booking(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
-   
+    class Meta:
+        indexes = [
+            # Serves the consultant dashboard keyset pagination
+            models.Index(fields=['consultant', '-created_at', '-id'], name='booking_consultant_recent_idx'),
+            # Busy times of a consultant, read by the free-window search
+            models.Index(fields=['consultant', 'start_at'], name='booking_consultant_start_idx'),
+            # Date-range exports across all consultants (app.exports)
+            models.Index(fields=['created_at', 'id'], name='booking_created_idx'),
+        ]
+        constraints = [
+            # Postgres refuses two live bookings of one consultant whose times overlap (needs btree_gist)
+            PostgresExclusionConstraint(
+                name='booking_no_overlap',
+                expressions=[
+                    ('consultant', RangeOperators.EQUAL),
+                    (TsTzRange('start_at', 'end_at', RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(start_at__isnull=False) & ~Q(status='cancelled'),
+            ),
+        ]
 
     def __str__(self):
         client_name = self.client.username if self.client else "No Client"
@@ -123,8 +345,11 @@ class Booking(models.Model):
 
     @property
     def is_paid(self):
+        # Let use the annotated payment status when the queryset already provides it
+        if hasattr(self, 'payment_status'):
+            return self.payment_status == Payment.PaymentStatus.SUCCESS
         if hasattr(self, 'payment'): 
-            return self.payment.status == 'SUCCESS'
+            return self.payment.status == Payment.PaymentStatus.SUCCESS
         return False
 
 
@@ -155,6 +380,12 @@ class Payment(models.Model):
     )
     paid_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Date-range payment exports (app.exports)
+            models.Index(fields=['paid_at', 'id'], name='payment_paid_idx'),
+        ]
+
     def __str__(self):
         return f"Payment: {self.amount} - {self.status} (Ref {self.payment_reference})"
     
@@ -163,6 +394,75 @@ class Payment(models.Model):
         return self.amount / 100
 
 
+class PaymentEvent(models.Model):
+    # Paystack webhook deliveries, stored as they arrive and settled off-request
+    payment_reference = models.CharField(max_length=100)
+    event = models.CharField(max_length=50)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Paystack retries deliveries, so the same event is only recorded once
+            models.UniqueConstraint(fields=['payment_reference', 'event'], name='unique_payment_event'),
+        ]
+        indexes = [
+            models.Index(fields=['processed_at', 'received_at'], name='payment_event_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} (Ref {self.payment_reference})"
+
+
+class Job(models.Model):
+    # Background work picked up by `manage.py run_worker`, see app.jobs
+    class StatusChoices(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        DEAD = 'dead', 'Dead'
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=StatusChoices.choices,
+        default=StatusChoices.QUEUED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Workers always ask for the oldest due job in a given status
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.name} #{self.id} ({self.status})"
+
+
+class ChangeStamp(models.Model):
+    # Change counter per (scope, owner) behind the API's ETag / Last-Modified headers, see app.versioning
+    scope = models.CharField(max_length=50)
+    owner_id = models.PositiveBigIntegerField()
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'owner_id'], name='unique_change_stamp'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.owner_id} v{self.version}"
+
+
 class Review(models.Model):
     # Link to the specific booking
     booking = models.OneToOneField('Booking', on_delete=models.CASCADE, related_name='review')
@@ -171,10 +471,15 @@ class Review(models.Model):
     # Link to the consultant (derived from booking)
     consultant = models.ForeignKey('Consultant_Profile', on_delete=models.CASCADE, null=True, blank=True)
     
-    rating = models.PositiveSmallIntegerField()
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Admin date hierarchy and newest-first listing
+            models.Index(fields=['created_at', 'id'], name='review_created_idx'),
+        ]
 
     def __str__(self):
         return f"Review ({self.rating} stars) for {self.booking.consultant.user.username}"
\ No newline at end of file
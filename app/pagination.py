@@ -0,0 +1,118 @@
+import base64
+from datetime import datetime
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+PAGE_SIZE = 25
+
+
+def encode_cursor(row):
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Turn a cursor back into ``(created_at, id)``, or ``None`` if it was tampered with.
+    """
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Newest-first page of ``queryset`` keyed on (created_at, id).
+
+    Unlike OFFSET pagination the database seeks straight to the cursor, so
+    page 1000 costs the same as page 1. Returns ``(rows, next_cursor)``.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, pk = position
+        # Let lead with a plain range so the index seeks to the cursor and reads in order;
+        # the OR alone would be answered by scanning (or bitmap-sorting) every older row
+        queryset = queryset.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(id__lt=pk)
+        )
+
+    # Let fetch one extra row to know if there is a next page without a COUNT
+    rows = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    API pagination without COUNT(*) or deep OFFSETs: the cursor seeks on
+    (created_at, id), newest first.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class RankCursorPagination(CursorPagination):
+    """
+    Keyset pagination over search results, best match first.
+
+    DRF's cursor seeks on the first ordering field only and pages through
+    equal values with an OFFSET, which is every row when the rank is a
+    constant. Here the cursor carries the whole ``(rank, id)`` position.
+    """
+    ordering = ('-rank', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.reverse)
+        position = self._decode_position(cursor.position) if cursor and cursor.position else None
+
+        if position:
+            rank, pk = position
+            if reverse:
+                queryset = queryset.filter(Q(rank__gt=rank) | Q(rank=rank, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=pk))
+        queryset = queryset.order_by(*(('rank', 'id') if reverse else self.ordering))
+
+        # Let fetch one extra row to know if there is a page beyond this one
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def _decode_position(self, position):
+        try:
+            rank, pk = position.split('|')
+            return float(rank), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _cursor_link(self, row, reverse):
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse, position=f"{row.rank!r}|{row.id}"))
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self._cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self._cursor_link(self.page[0], reverse=True)
@@ -0,0 +1,84 @@
+import logging
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Booking, Payment
+from .capacity import set_booking_status
+from .events import PAYMENT_SUCCEEDED, publish
+
+
+logger = logging.getLogger(__name__)
+
+
+def settle_payment(reference, succeeded, amount=None, paid_at=None):
+    """
+    Record the outcome Paystack reported for ``reference``.
+
+    Safe to call more than once: a payment that already succeeded is left
+    alone, and the booking is only confirmed on the first success.
+    """
+    with transaction.atomic():
+        payment = (
+            Payment.objects.select_for_update()
+            .filter(payment_reference=reference)
+            .first()
+        )
+        if payment is None or payment.status == Payment.PaymentStatus.SUCCESS:
+            return payment
+        apply_outcome(payment, succeeded, amount, paid_at)
+
+    return payment
+
+
+def apply_outcome(payment, succeeded, amount=None, paid_at=None):
+    """
+    Mark a payment the caller has locked as succeeded or failed, confirm its
+    booking and tell the consultant's dashboard. Shared by the webhook and
+    reconcile_payments, so both settle a payment the same way.
+
+    A successful charge is always recorded, since the money was taken. Only
+    a booking still PENDING is confirmed; one that was cancelled meanwhile
+    (its seat may be gone) is left as it is and logged for a refund, so a
+    late payment never rolls back.
+    """
+    # Let never confirm a booking for less than what we asked Paystack to charge
+    if not succeeded or (amount is not None and int(amount) < payment.amount):
+        payment.status = Payment.PaymentStatus.FAILED
+        payment.save(update_fields=['status'])
+        return payment.status
+
+    payment.status = Payment.PaymentStatus.SUCCESS
+    payment.paid_at = paid_at or timezone.now()
+    payment.save(update_fields=['status', 'paid_at'])
+    # Locked, so a cancel cannot slip in between this check and the confirmation
+    booking = Booking.objects.select_for_update().get(pk=payment.booking_id)
+    if booking.status == Booking.StatusChoices.PENDING:
+        set_booking_status(booking, Booking.StatusChoices.CONFIRMED)
+    elif booking.status == Booking.StatusChoices.CANCELLED:
+        logger.warning(
+            "Payment %s succeeded for %s booking #%s, it needs a refund",
+            payment.payment_reference, booking.status, booking.pk,
+        )
+    publish(booking.consultant_id, PAYMENT_SUCCEEDED, {
+        'id': payment.booking_id,
+        'amount': payment.amount,
+        'paid_at': payment.paid_at.isoformat(),
+        'booking_status': booking.status,
+    })
+    return payment.status
+
+
+def process_payment_event(event):
+    data = event.payload.get('data') or {}
+
+    if event.event == 'charge.success':
+        settle_payment(
+            event.payment_reference,
+            succeeded=data.get('status') == 'success',
+            amount=data.get('amount'),
+            paid_at=parse_datetime(data.get('paid_at') or ''),
+        )
+
+    event.processed_at = timezone.now()
+    event.save(update_fields=['processed_at'])
+
@@ -0,0 +1,143 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from .metrics import observe_http
+
+
+class PaystackError(Exception):
+    """
+    Paystack could not be reached or sent back something we cannot read.
+    """
+
+
+class PaystackUnavailable(PaystackError):
+    """
+    Raised without calling Paystack while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop calling Paystack for ``reset_timeout`` seconds after
+    ``failure_threshold`` failures in a row, so workers fail fast
+    during an outage instead of waiting on timeouts.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            # Half-open: let one trial request through once the cool-down is over
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class PaystackClient:
+    """
+    Thin Paystack API client sharing one pooled ``requests.Session`` per
+    process, with connect/read timeouts on every call.
+    """
+
+    def __init__(self, secret_key=None, base_url=None, pool_size=None):
+        self.secret_key = secret_key or settings.PAYSTACK_SECRET_KEY
+        self.base_url = (base_url or settings.PAYSTACK_BASE_URL).rstrip('/')
+        self.timeout = (settings.PAYSTACK_CONNECT_TIMEOUT, settings.PAYSTACK_READ_TIMEOUT)
+        self.verify_retries = settings.PAYSTACK_VERIFY_RETRIES
+        self.breaker = CircuitBreaker(
+            settings.PAYSTACK_BREAKER_THRESHOLD,
+            settings.PAYSTACK_BREAKER_RESET,
+        )
+
+        # Let keep TLS connections alive between calls instead of a new handshake each time
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size or settings.PAYSTACK_POOL_SIZE,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.secret_key}",
+            "Content-Type": "application/json",
+        })
+
+    def initialize(self, email, amount, reference, callback_url):
+        payload = {
+            "email": email,
+            "amount": int(amount),
+            "reference": str(reference),
+            "callback_url": callback_url,
+        }
+        # Not retried: a second initialize with the same reference is rejected by Paystack
+        return self._request("POST", "/transaction/initialize", json=payload)
+
+    def verify(self, reference):
+        # Verify is idempotent, so transient failures are retried with backoff
+        return self._request("GET", f"/transaction/verify/{reference}", retries=self.verify_retries)
+
+    def _send(self, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        finally:
+            # Let the metrics middleware attribute gateway time to the calling view
+            observe_http(time.perf_counter() - started)
+
+    def _request(self, method, path, retries=0, **kwargs):
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise PaystackUnavailable("Paystack is unavailable, please try again shortly.")
+            try:
+                response = self._send(method, path, **kwargs)
+                if response.status_code >= 500:
+                    raise PaystackError(f"Paystack returned HTTP {response.status_code}")
+                data = response.json()
+            except (requests.RequestException, PaystackError, ValueError) as e:
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise PaystackError(str(e)) from e
+                time.sleep(settings.PAYSTACK_RETRY_BACKOFF * (2 ** attempt))
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return data
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Process-wide client, so the connection pool and breaker are shared by all requests.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PaystackClient()
+    return _client
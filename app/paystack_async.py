@@ -0,0 +1,93 @@
+import asyncio
+import time
+import weakref
+import httpx
+from django.conf import settings
+from .metrics import observe_http
+from .paystack import CircuitBreaker, PaystackError, PaystackUnavailable
+
+
+class AsyncPaystackClient:
+    """
+    asyncio version of ``PaystackClient`` for the async payment views, with
+    the same timeouts, retries and circuit breaker on a pooled
+    ``httpx.AsyncClient``. A call waiting on Paystack only parks its
+    coroutine, so one ASGI worker keeps serving other requests meanwhile.
+    """
+
+    def __init__(self, secret_key=None, base_url=None, pool_size=None):
+        self.secret_key = secret_key or settings.PAYSTACK_SECRET_KEY
+        self.base_url = (base_url or settings.PAYSTACK_BASE_URL).rstrip('/')
+        self.verify_retries = settings.PAYSTACK_VERIFY_RETRIES
+        self.breaker = CircuitBreaker(
+            settings.PAYSTACK_BREAKER_THRESHOLD,
+            settings.PAYSTACK_BREAKER_RESET,
+        )
+
+        # Let keep TLS connections alive between calls, as the sync client does
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.PAYSTACK_READ_TIMEOUT, connect=settings.PAYSTACK_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=pool_size or settings.PAYSTACK_ASYNC_POOL_SIZE),
+            headers={
+                "Authorization": f"Bearer {self.secret_key}",
+                "Content-Type": "application/json",
+            },
+        )
+
+    async def initialize(self, email, amount, reference, callback_url):
+        payload = {
+            "email": email,
+            "amount": int(amount),
+            "reference": str(reference),
+            "callback_url": callback_url,
+        }
+        # Not retried: a second initialize with the same reference is rejected by Paystack
+        return await self._request("POST", "/transaction/initialize", json=payload)
+
+    async def verify(self, reference):
+        return await self._request("GET", f"/transaction/verify/{reference}", retries=self.verify_retries)
+
+    async def _send(self, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self.client.request(method, self.base_url + path, **kwargs)
+        finally:
+            observe_http(time.perf_counter() - started)
+
+    async def _request(self, method, path, retries=0, **kwargs):
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise PaystackUnavailable("Paystack is unavailable, please try again shortly.")
+            try:
+                response = await self._send(method, path, **kwargs)
+                if response.status_code >= 500:
+                    raise PaystackError(f"Paystack returned HTTP {response.status_code}")
+                data = response.json()
+            except (httpx.HTTPError, PaystackError, ValueError) as e:
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise PaystackError(str(e)) from e
+                await asyncio.sleep(settings.PAYSTACK_RETRY_BACKOFF * (2 ** attempt))
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return data
+
+
+# An httpx.AsyncClient belongs to the event loop it was first used on
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    Client shared by every request on the running event loop. Under an ASGI
+    server that is one loop per worker process; under WSGI each async view
+    gets a loop of its own, so there is no pooling there.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncPaystackClient()
+    return client
@@ -0,0 +1,83 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubPaystackHandler(BaseHTTPRequestHandler):
+    """
+    Answers the two Paystack endpoints the app uses with canned responses.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/transaction/initialize':
+            return self._send(404, {"status": False, "message": "Not found"})
+
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        reference = payload.get('reference', '')
+        host = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+        self._send(200, {
+            "status": True,
+            "message": "Authorization URL created",
+            "data": {
+                "authorization_url": f"{host}/checkout/{reference}",
+                "access_code": reference[:12],
+                "reference": reference,
+            },
+        })
+
+    def do_GET(self):
+        prefix = '/transaction/verify/'
+        if not self.path.startswith(prefix):
+            return self._send(404, {"status": False, "message": "Not found"})
+
+        reference = self.path[len(prefix):]
+        self._send(200, {
+            "status": True,
+            "message": "Verification successful",
+            "data": {"status": self.server.verify_status, "reference": reference, "amount": 500000},
+        })
+
+    def _send(self, status, body):
+        # Simulate network latency and an unhealthy gateway when asked to
+        time.sleep(self.server.latency)
+        if self.server.failure_rate and random.random() < self.server.failure_rate:
+            status, body = 503, {"status": False, "message": "Service unavailable"}
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_stub_server(host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, verify_status='success', verbose=False):
+    """
+    Build a local Paystack stand-in. ``port=0`` picks a free port, read it
+    back from ``server.server_address`` and point PAYSTACK_BASE_URL at it.
+    """
+    server = ThreadingHTTPServer((host, port), StubPaystackHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.failure_rate = failure_rate
+    server.verify_status = verify_status
+    server.verbose = verbose
+    return server
+
+
+def start_stub_server(**kwargs):
+    """
+    Run the stub in a background thread, for tests and benchmarks.
+    Call ``server.shutdown()`` when done.
+    """
+    server = make_stub_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
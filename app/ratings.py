@@ -0,0 +1,20 @@
+from django.db.models import F
+from .models import Consultant_Profile
+
+
+def shift_rating(consultant_id, rating, delta):
+    """
+    Add (``delta=1``) or remove (``delta=-1``) one review of ``rating`` stars
+    from a consultant's aggregates in a single UPDATE.
+    """
+    if consultant_id is None or rating is None:
+        return
+
+    changes = {
+        'rating_count': F('rating_count') + delta,
+        'rating_sum': F('rating_sum') + delta * rating,
+    }
+    if 1 <= rating <= 5:
+        changes[f'rating_{rating}'] = F(f'rating_{rating}') + delta
+
+    Consultant_Profile.objects.filter(pk=consultant_id).update(**changes)
@@ -0,0 +1,96 @@
+from datetime import time
+from django.db.models import F
+from .caching import invalidate_consultant
+from .models import Availability, AvailabilityRule
+from .versioning import AVAILABILITIES, bump_stamp
+
+
+def rule_slot(rule, day):
+    """
+    Unsaved Availability standing in for a rule date nobody has booked yet.
+    """
+    return Availability(
+        consultant_id=rule.consultant_id,
+        date=day,
+        max_slot=rule.max_slot,
+        rule=rule,
+        start_time=rule.start_time,
+        end_time=rule.end_time,
+    )
+
+
+def next_slots(from_date, to_date=None, consultants=None):
+    """
+    Earliest date with a free seat of every consultant on or after
+    ``from_date`` (and up to ``to_date``), from their Availability rows or
+    their recurring rules, soonest first. ``consultants`` narrows it to a
+    Consultant_Profile queryset.
+
+    Three queries however long the rules run: rule dates are never written
+    out, only the first open one of each rule is worked out here.
+    """
+    open_rows = Availability.objects.filter(reserved_count__lt=F('max_slot'))
+    rules = AvailabilityRule.objects.filter(end_date__gte=from_date)
+    if to_date is not None:
+        open_rows = open_rows.filter(date__lte=to_date)
+        rules = rules.filter(start_date__lte=to_date)
+    if consultants is not None:
+        open_rows = open_rows.filter(consultant__in=consultants)
+        rules = rules.filter(consultant__in=consultants)
+
+    slots = {
+        slot.consultant_id: slot
+        for slot in open_rows.next_per_consultant(from_date).select_related('consultant__user')
+    }
+
+    rules = list(rules.select_related('consultant__user'))
+    # Rule dates that were booked up already have a row, but no seat
+    full = set(
+        Availability.objects.filter(
+            consultant_id__in={rule.consultant_id for rule in rules},
+            date__gte=from_date,
+            reserved_count__gte=F('max_slot'),
+        ).values_list('consultant_id', 'date')
+    )
+
+    for rule in rules:
+        last = rule.end_date if to_date is None else min(rule.end_date, to_date)
+        day = next(
+            (day for day in rule.dates(from_date, last) if (rule.consultant_id, day) not in full),
+            None,
+        )
+        current = slots.get(rule.consultant_id)
+        if day is None or (current is not None and current.date <= day):
+            continue
+        # Earlier than the consultant's first open row and not full, so that date has no row yet
+        slot = rule_slot(rule, day)
+        slot.consultant = rule.consultant
+        slots[rule.consultant_id] = slot
+
+    # Whole-day slots count as open from the start of the day
+    return sorted(slots.values(), key=lambda slot: (slot.date, slot.start_time or time.min))
+
+
+def materialize(rule, day):
+    """
+    The Availability row for ``day`` of ``rule``, created on its first booking.
+
+    ``ignore_conflicts`` makes two clients booking the same new date at once
+    end up on the one row kept by the (consultant, date) unique index; a row
+    the consultant added by hand for that date wins over the rule.
+    """
+    Availability.objects.bulk_create(
+        [Availability(
+            consultant_id=rule.consultant_id,
+            date=day,
+            max_slot=rule.max_slot,
+            rule=rule,
+            start_time=rule.start_time,
+            end_time=rule.end_time,
+        )],
+        ignore_conflicts=True,
+    )
+    # bulk_create skips post_save, so the stamps and cached lists are moved here
+    bump_stamp(AVAILABILITIES, rule.consultant_id)
+    invalidate_consultant(rule.consultant_id)
+    return Availability.objects.get(consultant_id=rule.consultant_id, date=day)
@@ -0,0 +1,75 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+from .models import Availability, AvailabilityRule, Consultant_Profile
+
+
+def is_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def refresh_search_vector(profile):
+    """
+    Rebuild the stored tsvector of one profile. Name and specialization weigh
+    more than the bio. The user's name is passed as a value because an UPDATE
+    cannot join to the user table.
+    """
+    if not is_postgres():
+        return
+    user = profile.user
+    name = f"{user.get_full_name()} {user.username}"
+    Consultant_Profile.objects.filter(pk=profile.pk).update(
+        search_vector=(
+            SearchVector(Value(name), weight='A', config='english')
+            + SearchVector('specialization', weight='A', config='english')
+            + SearchVector('bio', weight='B', config='english')
+        )
+    )
+
+
+def search_consultants(q='', is_active=True, available=False):
+    """
+    Consultant profiles matching ``q``, annotated with a ``rank`` to order by.
+
+    On Postgres this uses the GIN-indexed tsvector plus pg_trgm similarity on
+    the specialization for typos. Other backends fall back to LIKE matching
+    with a constant rank.
+    """
+    profiles = Consultant_Profile.objects.select_related('user')
+
+    if is_active is not None:
+        profiles = profiles.filter(is_active=is_active)
+
+    if available:
+        # Let keep only consultants with an upcoming date that still has a free seat
+        open_slots = Availability.objects.filter(
+            consultant=OuterRef('pk'),
+            date__gte=timezone.now().date(),
+            reserved_count__lt=F('max_slot'),
+        )
+        # Rule dates nobody has booked yet are always open
+        running_rules = AvailabilityRule.objects.filter(consultant=OuterRef('pk'), end_date__gte=timezone.now().date())
+        profiles = profiles.filter(Exists(open_slots) | Exists(running_rules))
+
+    q = q.strip()
+    if not q:
+        return profiles.annotate(rank=Value(0.0, output_field=FloatField()))
+
+    if is_postgres():
+        query = SearchQuery(q, search_type='websearch', config='english')
+        return profiles.filter(
+            Q(search_vector=query) | Q(specialization__trigram_similar=q)
+        ).annotate(
+            # Let cast the real to double precision, so a rank read back from a cursor compares equal
+            rank=Cast(SearchRank(F('search_vector'), query) + TrigramSimilarity('specialization', q), FloatField())
+        )
+
+    return profiles.filter(
+        Q(specialization__icontains=q)
+        | Q(bio__icontains=q)
+        | Q(user__username__icontains=q)
+        | Q(user__first_name__icontains=q)
+        | Q(user__last_name__icontains=q)
+    ).annotate(rank=Value(1.0, output_field=FloatField()))
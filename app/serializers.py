@@ -1,16 +1,128 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Availability, Booking
+from .models import Availability, AvailabilityRule, Booking, Consultant_Profile, check_working_hours
+from .recurrence import rule_slot
+from .timeslots import window_end
 
 
-class BookingSerializer(serializers.ModelSerializer):
+def query_list(request, param):
+    """
+    Comma separated query parameter as a list, e.g. ``?fields=id,status``.
+    """
+    value = request.query_params.get(param, '') if request else ''
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    Lets GET requests trim the response with ``?fields=`` and embed related
+    objects listed in ``expandable_fields`` with ``?expand=``.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+
+        for name in query_list(request, 'expand'):
+            if name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](read_only=True)
+
+        wanted = query_list(request, 'fields')
+        if wanted:
+            for name in set(self.fields) - set(wanted):
+                self.fields.pop(name)
+
+
+class ConsultantSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    full_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Consultant_Profile
+        fields = ["id", "username", "full_name", "specialization", "bio", "is_active", "average_rating", "rating_count"]
+
+
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'consultant': ConsultantSerializer}
+    # A recurring rule date that has no availability yet can be booked with rule + date
+    rule = serializers.PrimaryKeyRelatedField(queryset=AvailabilityRule.objects.all(), write_only=True, required=False)
+    date = serializers.DateField(write_only=True, required=False)
+
     class Meta:
         model = Booking
-        fields = ["id", "availability", "reason_for_session", "consultant", 'created_at', 'status', 'consultant']
-        read_only_fields = ("cleint", "status", "created_at",)
+        fields = ["id", "availability", "rule", "date", "start_at", "end_at", "reason_for_session", "consultant", 'created_at', 'status', 'consultant']
+        read_only_fields = ("cleint", "status", "created_at", "end_at",)
+        extra_kwargs = {
+            'availability': {'required': False},
+            'consultant': {'required': False},
+        }
+
+    def validate(self, attrs):
+        rule = attrs.pop('rule', None)
+        day = attrs.pop('date', None)
+        if rule is not None:
+            if day is None or day < timezone.now().date() or not rule.occurs_on(day):
+                raise serializers.ValidationError({'date': ["This date is not part of the rule."]})
+            # Validation never writes: an unsaved stand-in until BookingViewSet saves the booking
+            attrs['availability'] = (
+                Availability.objects.filter(consultant_id=rule.consultant_id, date=day).first()
+                or rule_slot(rule, day)
+            )
+
+        availability = attrs.get('availability') or getattr(self.instance, 'availability', None)
+        if availability is None:
+            raise serializers.ValidationError({'availability': ["This field is required."]})
+        attrs['consultant'] = availability.consultant
+
+        if 'availability' in attrs or 'start_at' in attrs:
+            start_at = attrs.get('start_at', getattr(self.instance, 'start_at', None))
+            try:
+                attrs['end_at'] = window_end(availability, start_at)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({'start_at': e.messages})
+        return attrs
+
+
+class AvailabilitySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'consultant': ConsultantSerializer}
+    remaining_slots = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Availability
+        fields = ["id", "consultant", "max_slot", "date", "start_time", "end_time", "reserved_count", "confirmed_count", "remaining_slots", ]
+        read_only_fields = ("consultant", "created_at", "reserved_count", "confirmed_count",)
+
+    def validate(self, attrs):
+        hours = Availability(
+            start_time=attrs.get('start_time', getattr(self.instance, 'start_time', None)),
+            end_time=attrs.get('end_time', getattr(self.instance, 'end_time', None)),
+        )
+        check_working_hours(hours)
+        return attrs
+
+
+class FreeWindowSerializer(serializers.Serializer):
+    consultant = ConsultantSerializer(source='slot.consultant')
+    # Book with the availability id, or with rule + date while the date has no availability yet
+    availability = serializers.IntegerField(source='slot.pk', allow_null=True)
+    rule = serializers.IntegerField(source='slot.rule_id', allow_null=True)
+    date = serializers.DateField(source='slot.date')
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
 
+class MatchSerializer(serializers.ModelSerializer):
+    consultant = ConsultantSerializer(read_only=True)
+    # Null for a recurring rule date that has no availability yet: book it with rule + date
+    id = serializers.IntegerField(read_only=True, allow_null=True)
+    rule = serializers.IntegerField(source='rule_id', read_only=True, allow_null=True)
+    remaining_slots = serializers.IntegerField(read_only=True)
 
-class AvailabilitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Availability
-        fields = ["id", "consultant", "max_slot", "date", ]
-        read_only_fields = ("consultant", "created_at",)
\ No newline at end of file
+        fields = ["id", "rule", "date", "start_time", "end_time", "remaining_slots", "consultant"]
@@ -0,0 +1,25 @@
+from django.contrib.sessions.backends import db, signed_cookies
+
+
+class SessionStore(signed_cookies.SessionStore):
+    """
+    Signed-cookie sessions that still accept the session ids handed out by
+    the ``db`` / ``cached_db`` backends.
+
+    A visitor arriving with an old id is loaded from the session table once
+    and leaves with a signed cookie, so switching ``SESSION_MODE`` to
+    ``signed_cookies`` does not log anyone out.
+    """
+
+    def load(self):
+        session_key = self.session_key
+        data = super().load()
+        if data or not session_key or ':' in session_key:
+            return data
+
+        # Not a signed payload: let look it up as a database session id
+        data = db.SessionStore(session_key).load()
+        if data:
+            # Let write the data back as a signed cookie on this response
+            self.modified = True
+        return data
@@ -0,0 +1,127 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_migrate, pre_save
+from django.dispatch import receiver
+from .models import Availability, AvailabilityRule, Booking, Consultant_Profile, CustomUser, Review
+from .caching import invalidate_consultant
+from .events import BOOKING_CREATED, booking_data, publish
+from .ratings import shift_rating
+from .search import refresh_search_vector
+from .versioning import (
+    AVAILABILITIES, CLIENT_BOOKINGS, CONSULTANT_BOOKINGS, PROFILES,
+    bump_stamp,
+)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    bump_stamp(CLIENT_BOOKINGS, instance.client_id)
+    bump_stamp(CONSULTANT_BOOKINGS, instance.consultant_id)
+    # Booking changes move the slot counters shown in the cached lists
+    invalidate_consultant(instance.consultant_id)
+
+
+@receiver(post_save, sender=Booking)
+def booking_created(sender, instance, created, **kwargs):
+    # Let open consultant dashboards add the row without a reload
+    if created:
+        publish(instance.consultant_id, BOOKING_CREATED, booking_data(instance))
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+def availability_changed(sender, instance, **kwargs):
+    bump_stamp(AVAILABILITIES, instance.consultant_id)
+    invalidate_consultant(instance.consultant_id)
+
+
+@receiver(post_save, sender=AvailabilityRule)
+@receiver(post_delete, sender=AvailabilityRule)
+def availability_rule_changed(sender, instance, **kwargs):
+    invalidate_consultant(instance.consultant_id)
+
+
+@receiver(pre_save, sender=Consultant_Profile)
+def profile_before_save(sender, instance, **kwargs):
+    # Let remember the specialization an edit moves the profile away from
+    instance._previous_specialization = None
+    if instance.pk:
+        instance._previous_specialization = (
+            Consultant_Profile.objects.filter(pk=instance.pk).values_list('specialization', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Consultant_Profile)
+@receiver(post_delete, sender=Consultant_Profile)
+def profile_changed(sender, instance, **kwargs):
+    # Expanded consultant data can appear in any client's bookings
+    bump_stamp(PROFILES, 0)
+    # Both the old and the new specialization listings may show this profile
+    invalidate_consultant(
+        instance.id,
+        [getattr(instance, '_previous_specialization', None), instance.specialization],
+    )
+
+
+@receiver(post_save, sender=Consultant_Profile)
+def profile_saved(sender, instance, **kwargs):
+    refresh_search_vector(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Let skip the last_login write that happens on every login
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    if instance.is_consultant:
+        bump_stamp(PROFILES, 0)
+        # The consultant's name is part of the search document
+        profile = Consultant_Profile.objects.filter(user=instance).first()
+        if profile is not None:
+            refresh_search_vector(profile)
+            invalidate_consultant(profile.id)
+
+
+@receiver(pre_save, sender=Review)
+def review_before_save(sender, instance, **kwargs):
+    # Let remember what an edited review counted for before it changes (admin edits)
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk).values_list('consultant_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if previous == (instance.consultant_id, instance.rating):
+        return
+    if previous:
+        shift_rating(previous[0], previous[1], -1)
+    shift_rating(instance.consultant_id, instance.rating, 1)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    shift_rating(instance.consultant_id, instance.rating, -1)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # The rating aggregates are updated in SQL, so the profile signals do not fire for them
+    bump_stamp(PROFILES, 0)
+    invalidate_consultant(instance.consultant_id)
+
+
+@receiver(pre_migrate)
+def enable_postgres_extensions(sender, app_config=None, using='default', **kwargs):
+    # Let make sure pg_trgm and btree_gist exist before the trigram index and the overlap constraint
+    if app_config is None or app_config.name != 'app':
+        return
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
@@ -0,0 +1,42 @@
+from django.utils.dateparse import parse_datetime
+from .images import delete_files, process_profile_picture
+from .jobs import job
+from .models import PaymentEvent
+from .payments import process_payment_event, settle_payment
+from .paystack import get_client
+
+
+@job('settle_payment_event')
+def settle_payment_event(event_id):
+    event = PaymentEvent.objects.filter(pk=event_id, processed_at__isnull=True).first()
+    if event is not None:
+        process_payment_event(event)
+
+
+@job('verify_payment')
+def verify_payment(reference):
+    # A PaystackError here makes the worker retry the job with backoff
+    response_data = get_client().verify(reference)
+    if not response_data.get("status"):
+        return
+
+    data = response_data["data"]
+    if data["status"] == "success":
+        settle_payment(
+            reference,
+            succeeded=True,
+            amount=data.get("amount"),
+            paid_at=parse_datetime(data.get("paid_at") or ""),
+        )
+    elif data["status"] == "failed":
+        settle_payment(reference, succeeded=False)
+
+
+@job('process_profile_picture')
+def process_profile_picture_job(user_id, picture):
+    process_profile_picture(user_id, picture)
+
+
+@job('delete_files')
+def delete_files_job(names):
+    delete_files(names)
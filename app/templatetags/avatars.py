@@ -0,0 +1,34 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from app.images import avatar_url as _avatar_url
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_url(user, size, fmt='webp'):
+    """
+    ``{% avatar_url request.user 128 %}`` -> smallest avatar variant that fits.
+    """
+    return _avatar_url(user, int(size), fmt)
+
+
+@register.simple_tag
+def avatar_picture(user, size, **attrs):
+    """
+    ``{% avatar_picture request.user 256 class="rounded-circle" %}`` -> a
+    ``<picture>`` with the WebP variant, and the JPEG one in its ``<img>``
+    for browsers without WebP. Extra keyword arguments become ``<img>`` attributes.
+    """
+    size = int(size)
+    if not user.profile_picture_variants:
+        # Still processing: only the upload exists
+        return format_html('<img src="{}"{}>', _avatar_url(user, size), flatatt(attrs))
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp"><img src="{}"{}></picture>',
+        _avatar_url(user, size, 'webp'),
+        _avatar_url(user, size, 'jpeg'),
+        flatatt(attrs),
+    )
@@ -0,0 +1,35 @@
+from django import template
+from app.caching import get_or_build
+
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, key, timeout):
+        self.nodelist = nodelist
+        self.key = key
+        self.timeout = timeout
+
+    def render(self, context):
+        key = self.key.resolve(context)
+        timeout = self.timeout.resolve(context) if self.timeout else None
+        # Lazy querysets inside the block are only run when the fragment is rebuilt
+        return get_or_build(f"fragment:{key}", lambda: self.nodelist.render(context), timeout)
+
+
+@register.tag
+def cached_fragment(parser, token):
+    """
+    ``{% cached_fragment key [timeout] %} ... {% endcached_fragment %}``
+
+    Like ``{% cache %}`` but keyed by a versioned key from app.caching and
+    protected against stampedes by ``get_or_build``.
+    """
+    bits = token.split_contents()
+    if len(bits) not in (2, 3):
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a cache key and an optional timeout.")
+    nodelist = parser.parse(('endcached_fragment',))
+    parser.delete_first_token()
+    timeout = parser.compile_filter(bits[2]) if len(bits) == 3 else None
+    return CachedFragmentNode(nodelist, parser.compile_filter(bits[1]), timeout)
@@ -0,0 +1,90 @@
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from app.admin import EstimatedCountPaginator
+from app.models import Booking, CustomUser
+from .utils import make_availability, make_client, make_consultant
+
+
+class UserSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        # More matching users than the old 1000-id cap kept, all with lower ids than the real carol
+        CustomUser.objects.bulk_create(
+            CustomUser(username=f'carol{n}', email=f'carol{n}@example.com') for n in range(1100)
+        )
+        alice = make_consultant('alice')
+        bob = make_consultant('bob')
+        cls.bookings = {}
+        for consultant in (alice, bob):
+            availability = make_availability(consultant)
+            for name in ('carol', 'dave', 'erin'):
+                client = CustomUser.objects.filter(username=name).first() or make_client(name)
+                cls.bookings[consultant.user.username, name] = Booking.objects.create(
+                    client=client, consultant=consultant, availability=availability, reason_for_session='Tax',
+                )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def search(self, term):
+        response = self.client.get(reverse('admin:app_booking_changelist'), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return {booking.pk for booking in response.context['cl'].result_list}
+
+    def expected(self, *pairs):
+        return {self.bookings[pair].pk for pair in pairs}
+
+    def test_single_term_matches_client_or_consultant(self):
+        self.assertEqual(self.search('alice'), self.expected(('alice', 'carol'), ('alice', 'dave'), ('alice', 'erin')))
+        self.assertEqual(self.search('carol'), self.expected(('alice', 'carol'), ('bob', 'carol')))
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('bob dave'), self.expected(('bob', 'dave')))
+        self.assertEqual(self.search('bob nobody'), set())
+
+    def test_quoted_phrase_is_one_term(self):
+        self.assertEqual(self.search('"erin" alice'), self.expected(('alice', 'erin')))
+        self.assertEqual(self.search('"alice bob"'), set())
+
+    def test_match_is_not_capped(self):
+        self.assertEqual(len(self.search('carol')), 2)
+
+
+class EstimatedCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        consultant = make_consultant('alice')
+        availability = make_availability(consultant, max_slot=5)
+        for name in ('carol', 'dave'):
+            Booking.objects.create(
+                client=make_client(name), consultant=consultant, availability=availability, reason_for_session='Tax',
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        # Let pretend Postgres' statistics put the table at a million rows
+        patcher = mock.patch.object(EstimatedCountPaginator, 'estimate', return_value=1_000_000)
+        self.estimate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def count(self, **params):
+        response = self.client.get(reverse('admin:app_booking_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl'].result_count
+
+    def test_unfiltered_list_uses_the_estimate(self):
+        self.assertEqual(self.count(), 1_000_000)
+
+    def test_filtered_and_searched_lists_are_counted(self):
+        self.assertEqual(self.count(status=Booking.StatusChoices.PENDING), 2)
+        self.assertEqual(self.count(q='carol'), 1)
+        self.estimate.assert_not_called()
+
+    def test_small_table_is_counted(self):
+        self.estimate.return_value = 50
+        self.assertEqual(self.count(), 2)
@@ -0,0 +1,248 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.mixins import ListModelMixin
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.viewsets import GenericViewSet
+from app.caching import invalidate_consultant
+from app.models import Availability, AvailabilityRule, Booking, ChangeStamp, CustomUser, Review
+from app.serializers import AvailabilitySerializer
+from app.viewsets import CachedListMixin, ConditionalListMixin
+from .utils import make_availability, make_client, make_consultant
+
+
+class ConditionalListTests(TestCase):
+    url = '/api/client/bookings/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        cls.availability = make_availability(cls.consultant)
+        cls.client_user = make_client('client')
+
+    def setUp(self):
+        self.client.force_login(self.client_user)
+
+    def test_get_never_writes_a_stamp(self):
+        stamps = list(ChangeStamp.objects.values_list('scope', 'owner_id', 'version'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(ChangeStamp.objects.values_list('scope', 'owner_id', 'version')), stamps)
+
+        response = self.client.get(self.url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_moves_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Booking.objects.create(
+            client=self.client_user, consultant=self.consultant,
+            availability=self.availability, reason_for_session='Tax',
+        )
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_review_moves_the_expanded_etag(self):
+        booking = Booking.objects.create(
+            client=self.client_user, consultant=self.consultant,
+            availability=self.availability, reason_for_session='Tax',
+        )
+        url = f"{self.url}?expand=consultant"
+        etag = self.client.get(url)['ETag']
+        Review.objects.create(booking=booking, client=self.client_user, consultant=self.consultant, rating=4, comment='Good')
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['consultant']['rating_count'], 1)
+
+        call_command('rebuild_rating_stats', stdout=StringIO())
+        self.assertNotEqual(self.client.get(url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_viewset_without_stamps_fails_at_definition(self):
+        with self.assertRaises(ImproperlyConfigured):
+            class NoStamps(ConditionalListMixin, GenericViewSet):
+                pass
+
+
+    def test_consultant_without_profile_gets_an_empty_list(self):
+        user = CustomUser.objects.create(username='new', email='new@example.com', role=CustomUser.Role.CONSULTANT)
+        self.client.force_login(user)
+        response = self.client.get('/api/consultant/availabilities/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+class BookingListQueryTests(TestCase):
+    url = '/api/client/bookings/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = make_client('client')
+        for n in range(3):
+            consultant = make_consultant(f'consultant{n}')
+            availability = make_availability(consultant, max_slot=5)
+            Booking.objects.bulk_create(
+                Booking(client=cls.client_user, consultant=consultant, availability=availability, reason_for_session='Tax')
+                for _ in range(4)
+            )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def test_page_is_one_query(self):
+        # Stamp, then the page itself: no COUNT(*), however many rows there are
+        with self.assertNumQueries(2):
+            response = self.api.get(f"{self.url}?page_size=5")
+        self.assertEqual(len(response.data['results']), 5)
+
+        # The next page seeks on the cursor with the same two queries
+        with self.assertNumQueries(2):
+            response = self.api.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_expand_joins_the_consultants(self):
+        # The profiles stamp joins the list stamps, the consultants come with the page
+        with self.assertNumQueries(3):
+            response = self.api.get(f"{self.url}?expand=consultant&page_size=12")
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(
+            {row['consultant']['username'] for row in response.data['results']},
+            {'consultant0', 'consultant1', 'consultant2'},
+        )
+
+    def test_fields_trims_the_rows(self):
+        with self.assertNumQueries(2):
+            response = self.api.get(f"{self.url}?fields=id,status")
+        self.assertEqual({tuple(row) for row in response.data['results']}, {('id', 'status')})
+
+
+class CachedListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        make_availability(cls.consultant)
+        cls.users = [make_client('first'), make_client('second')]
+
+    def setUp(self):
+        cache.clear()
+        self.builds = []
+        builds = self.builds
+
+        class Probe(CachedListMixin, ListModelMixin, GenericViewSet):
+            serializer_class = AvailabilitySerializer
+
+            def get_queryset(self):
+                builds.append(self.request.user.pk)
+                return Availability.objects.order_by('id')
+
+        self.view = Probe.as_view({'get': 'list'}, basename='probe')
+
+    def get(self, user, query=''):
+        request = APIRequestFactory().get(f'/probe/{query}')
+        force_authenticate(request, user)
+        return self.view(request)
+
+    def test_default_key_is_per_user_and_url(self):
+        first, second = self.users
+        self.assertEqual(self.get(first).data, self.get(first).data)
+        self.get(second)
+        self.get(first, '?fields=id')
+        self.assertEqual(self.builds, [first.pk, second.pk, first.pk])
+
+    def test_default_key_is_dropped_on_consultant_change(self):
+        first = self.users[0]
+        self.get(first)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_consultant(self.consultant.id)
+        self.get(first)
+        self.assertEqual(self.builds, [first.pk, first.pk])
+
+
+class RuleBookingTests(TestCase):
+    url = '/api/client/bookings/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        cls.day = timezone.localdate() + timedelta(days=1)
+        cls.rule = AvailabilityRule.objects.create(
+            consultant=cls.consultant, weekdays=127, start_date=cls.day, end_date=cls.day + timedelta(days=7),
+            start_time=time(9), end_time=time(12), max_slot=2,
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(make_client('client'))
+
+    def book(self, hour, minute=0):
+        start_at = timezone.make_aware(datetime.combine(self.day, time(hour, minute)))
+        return self.api.post(self.url, {
+            'rule': self.rule.id, 'date': self.day, 'start_at': start_at, 'reason_for_session': 'Tax',
+        }, format='json')
+
+    def test_invalid_booking_writes_no_availability(self):
+        response = self.book(9, 10)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('start_at', response.data)
+        self.assertFalse(Availability.objects.exists())
+
+    def test_booking_creates_the_rule_date_once(self):
+        self.assertEqual(self.book(9).status_code, 201)
+        self.assertEqual(self.book(10).status_code, 201)
+
+        availability = Availability.objects.get()
+        self.assertEqual((availability.rule, availability.date), (self.rule, self.day))
+        self.assertEqual(availability.reserved_count, 2)
+        self.assertEqual(set(Booking.objects.values_list('availability', flat=True)), {availability.id})
+
+
+class ConsultantSearchTests(TestCase):
+    url = '/api/client/consultants/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = [make_consultant(f'tax{number}', bio='Audits') for number in range(7)]
+        cls.lawyer = make_consultant('lawyer', specialization='law')
+        cls.retired = make_consultant('retired', is_active=False)
+        make_availability(cls.lawyer, max_slot=1)
+        cls.client_user = make_client('client')
+
+    def setUp(self):
+        self.client.force_login(self.client_user)
+
+    def ids(self, query=''):
+        return [row['id'] for row in self.client.get(f"{self.url}?{query}").data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.ids('q=law'), [self.lawyer.id])
+        self.assertEqual(self.ids('available=true'), [self.lawyer.id])
+        self.assertEqual(self.ids('is_active=false'), [self.retired.id])
+        self.assertEqual(len(self.ids('is_active=any')), 9)
+
+    def test_pages_seek_on_rank_and_id(self):
+        expected = sorted((profile.id for profile in self.profiles), reverse=True)
+        seen, url = [], f"{self.url}?q=audits&page_size=3"
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                response = self.client.get(url)
+                seen += [row['id'] for row in response.data['results']]
+                url = response.data['next']
+        self.assertEqual(seen, expected)
+        self.assertFalse([query['sql'] for query in queries if 'OFFSET' in query['sql']])
+
+        # Let step back from the last page to the one before it
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], expected[3:6])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_tampered_cursor_is_not_found(self):
+        self.assertEqual(self.client.get(f"{self.url}?cursor=cD14").status_code, 404)
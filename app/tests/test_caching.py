@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase
+from app.caching import consultant_key, invalidate_consultant, specialization_key
+from .utils import make_consultant
+
+
+class InvalidateConsultantTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = make_consultant('consultant', specialization='Tax')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_no_query_before_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(0):
+                invalidate_consultant(self.profile.id)
+        key = consultant_key(self.profile.id, 'page')
+        with self.assertNumQueries(1):
+            callbacks[0]()
+        self.assertNotEqual(consultant_key(self.profile.id, 'page'), key)
+
+    def test_current_specialization_is_dropped(self):
+        key = specialization_key('tax', 'page')
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_consultant(self.profile.id)
+        self.assertNotEqual(specialization_key('TAX', 'page'), key)
+
+    def test_specialization_change_drops_old_and_new(self):
+        tax, law, design = (specialization_key(name, 'page') for name in ('tax', 'law', 'design'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.specialization = 'Law'
+            self.profile.save()
+        self.assertNotEqual(specialization_key('tax', 'page'), tax)
+        self.assertNotEqual(specialization_key('law', 'page'), law)
+        self.assertEqual(specialization_key('design', 'page'), design)
+
+    def test_deleted_profile_drops_its_specialization(self):
+        key = specialization_key('tax', 'page')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.delete()
+        self.assertNotEqual(specialization_key('tax', 'page'), key)
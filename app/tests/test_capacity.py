@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from unittest import skipUnless
+from io import StringIO
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from app.capacity import SlotFull, delete_booking, move_booking, reserve_booking, set_booking_status
+from app.models import Availability, Booking
+from app.versioning import AVAILABILITIES, get_stamp
+from .utils import make_availability, make_client, make_consultant
+
+
+class ReserveBookingTests(TestCase):
+
+    def setUp(self):
+        self.consultant = make_consultant('consultant')
+        self.availability = make_availability(self.consultant, max_slot=1)
+
+    def book(self, client):
+        return reserve_booking(Booking(
+            client=client, consultant=self.consultant,
+            availability=self.availability, reason_for_session='Tax review',
+        ))
+
+    def test_full_slot_refuses_booking(self):
+        self.book(make_client('first'))
+        with self.assertRaises(SlotFull):
+            self.book(make_client('second'))
+        self.availability.refresh_from_db()
+        self.assertEqual(self.availability.reserved_count, 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_cancelling_gives_the_seat_back(self):
+        booking = self.book(make_client('first'))
+        set_booking_status(booking, Booking.StatusChoices.CANCELLED)
+        self.book(make_client('second'))
+        with self.assertRaises(SlotFull):
+            set_booking_status(booking, Booking.StatusChoices.PENDING)
+        self.availability.refresh_from_db()
+        self.assertEqual(self.availability.reserved_count, 1)
+
+
+class CounterTests(TestCase):
+
+    def setUp(self):
+        self.consultant = make_consultant('consultant')
+        self.first = make_availability(self.consultant, max_slot=2)
+        self.second = make_availability(self.consultant, days_ahead=2, max_slot=2)
+
+    def book(self, name, availability=None):
+        return reserve_booking(Booking(
+            client=make_client(name), consultant=self.consultant,
+            availability=availability or self.first, reason_for_session='Tax review',
+        ))
+
+    def assertCounters(self, first, second):
+        counters = {pk: (reserved, confirmed) for pk, reserved, confirmed in
+                    Availability.objects.values_list('pk', 'reserved_count', 'confirmed_count')}
+        self.assertEqual((counters[self.first.pk], counters[self.second.pk]), (first, second))
+
+    def test_status_changes_move_the_counters(self):
+        booking = self.book('a')
+        self.book('b')
+        self.assertCounters((2, 0), (0, 0))
+        set_booking_status(booking, Booking.StatusChoices.CONFIRMED)
+        self.assertCounters((2, 1), (0, 0))
+        set_booking_status(booking, Booking.StatusChoices.CANCELLED)
+        self.assertCounters((1, 0), (0, 0))
+
+    def test_moving_and_deleting_carry_the_seat(self):
+        booking = set_booking_status(self.book('a'), Booking.StatusChoices.CONFIRMED)
+        old_availability_id = booking.availability_id
+        booking.availability = self.second
+        booking.save(update_fields=['availability'])
+        move_booking(booking, old_availability_id)
+        self.assertCounters((0, 0), (1, 1))
+
+        delete_booking(booking)
+        self.assertCounters((0, 0), (0, 0))
+
+    def test_counter_updates_move_the_api_stamp(self):
+        version = get_stamp(AVAILABILITIES, self.consultant.pk)[0]
+        self.book('a')
+        self.assertGreater(get_stamp(AVAILABILITIES, self.consultant.pk)[0], version)
+
+    def test_rebuild_recounts_from_bookings(self):
+        set_booking_status(self.book('a'), Booking.StatusChoices.CONFIRMED)
+        set_booking_status(self.book('b'), Booking.StatusChoices.CANCELLED)
+        self.book('c', self.second)
+        Availability.objects.update(reserved_count=7, confirmed_count=5)
+        version = get_stamp(AVAILABILITIES, self.consultant.pk)[0]
+
+        call_command('rebuild_availability_counters', stdout=StringIO())
+        self.assertCounters((1, 1), (1, 0))
+        self.assertGreater(get_stamp(AVAILABILITIES, self.consultant.pk)[0], version)
+
+
+class ConcurrentReserveTests(TransactionTestCase):
+    """
+    Many clients racing for the last seats of one availability, each on its
+    own thread and database connection.
+    """
+    CLIENTS = 12
+    MAX_SLOT = 3
+
+    def setUp(self):
+        self.consultant = make_consultant('consultant')
+        self.availability = make_availability(self.consultant, max_slot=self.MAX_SLOT)
+        self.clients = [make_client(f"client{n}") for n in range(self.CLIENTS)]
+
+    def race(self):
+        start = threading.Barrier(self.CLIENTS)
+        results = []
+
+        def book(client):
+            booking = Booking(
+                client=client, consultant=self.consultant,
+                availability_id=self.availability.id, reason_for_session='Tax review',
+            )
+            try:
+                start.wait()
+                while True:
+                    try:
+                        reserve_booking(booking)
+                        results.append('booked')
+                        return
+                    except SlotFull:
+                        results.append('full')
+                        return
+                    except OperationalError:
+                        # SQLite lets one writer in at a time, the others are told to come back
+                        if connection.vendor != 'sqlite':
+                            raise
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=book, args=(client,)) for client in self.clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_slot_is_never_oversold(self):
+        results = self.race()
+
+        availability = Availability.objects.get(pk=self.availability.pk)
+        self.assertEqual(len(results), self.CLIENTS)
+        self.assertLessEqual(availability.reserved_count, availability.max_slot)
+        self.assertEqual(availability.reserved_count, self.MAX_SLOT)
+        self.assertEqual(results.count('booked'), self.MAX_SLOT)
+        self.assertEqual(Booking.objects.filter(availability=availability).count(), self.MAX_SLOT)
+
+
+@skipUnless(os.getenv('BENCHMARK'), "set BENCHMARK=1 to run")
+class ReserveStressBenchmark(ConcurrentReserveTests):
+    """
+    ``BENCHMARK=1 STRESS_CLIENTS=80 python manage.py test app.tests.test_capacity.ReserveStressBenchmark``
+
+    The same race with many more clients, half of whom get a seat; prints
+    the bookings per second. ``STRESS_CLIENTS`` defaults to 80 on Postgres,
+    which stays under its default ``max_connections`` of 100, and to 20 on
+    SQLite, which takes one writer at a time.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.CLIENTS = int(os.getenv('STRESS_CLIENTS') or (80 if connection.vendor == 'postgresql' else 20))
+        cls.MAX_SLOT = cls.CLIENTS // 2
+
+    def race(self):
+        started = time.perf_counter()
+        results = super().race()
+        elapsed = time.perf_counter() - started
+        print(f"\nreserve_booking with {self.CLIENTS} clients on {connection.vendor}: "
+              f"{results.count('booked')} booked, {results.count('full')} full in {elapsed:.2f}s "
+              f"({results.count('booked') / elapsed:.0f} bookings/s)")
+        return results
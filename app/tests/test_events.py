@@ -0,0 +1,74 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from app.capacity import set_booking_status
+from app.events import STATUS_CHANGED, _stream, broker, publish
+from app.models import Booking
+from .utils import make_availability, make_client, make_consultant
+
+
+class ConsultantEventsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        cls.availability = make_availability(cls.consultant)
+        cls.client_user = make_client('client')
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(
+                client=self.client_user, consultant=self.consultant,
+                availability=self.availability, reason_for_session='Tax',
+            )
+
+    async def next_message(self, stream):
+        return await asyncio.wait_for(anext(stream), 1)
+
+    async def test_stream_receives_bookings_and_status_changes(self):
+        stream = _stream(self.consultant.id)
+        try:
+            self.assertEqual(await self.next_message(stream), "retry: 5000\n\n")
+
+            booking = await sync_to_async(self.book)()
+            message = await self.next_message(stream)
+            self.assertTrue(message.startswith("event: booking-created\n"))
+            self.assertIn(f'"id":{booking.id}', message)
+
+            def confirm():
+                with self.captureOnCommitCallbacks(execute=True):
+                    set_booking_status(booking, Booking.StatusChoices.CONFIRMED)
+
+            await sync_to_async(confirm)()
+            message = await self.next_message(stream)
+            self.assertEqual(message, f'event: {STATUS_CHANGED}\ndata: {{"id":{booking.id},"status":"confirmed"}}\n\n')
+        finally:
+            await stream.aclose()
+        self.assertNotIn(self.consultant.id, broker._subscribers)
+
+    @override_settings(EVENTS_QUEUE_SIZE=2)
+    async def test_slow_client_is_cut_off(self):
+        stream = _stream(self.consultant.id)
+        await self.next_message(stream)
+
+        def flood():
+            with self.captureOnCommitCallbacks(execute=True):
+                for n in range(3):
+                    publish(self.consultant.id, STATUS_CHANGED, {'id': n})
+
+        await sync_to_async(flood)()
+        # Let the loop run the dispatch callbacks
+        await asyncio.sleep(0)
+        # The stream ends instead of delivering a backlog; EventSource reconnects to a fresh page
+        self.assertEqual([message async for message in stream], [])
+        self.assertNotIn(self.consultant.id, broker._subscribers)
+
+    def test_wsgi_request_is_told_to_stop_retrying(self):
+        self.client.force_login(self.consultant.user)
+        self.assertEqual(self.client.get(reverse('consultant-events')).status_code, 204)
+
+    async def test_non_consultant_is_refused(self):
+        await self.async_client.aforce_login(self.client_user)
+        response = await self.async_client.get(reverse('consultant-events'))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+from django.test import TestCase
+from django.urls import reverse
+from app.exports import export_lines, export_queryset
+from app.models import Booking
+from .utils import make_availability, make_client, make_consultant
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        consultant = make_consultant('consultant')
+        cls.client_user = make_client('client')
+        availability = make_availability(consultant, max_slot=50)
+        Booking.objects.bulk_create(
+            Booking(client=cls.client_user, consultant=consultant, availability=availability, reason_for_session=reason)
+            for reason in ['=HYPERLINK("http://evil.example")', '+1', '-2', '@SUM(A1)', 'Tax review', 'a=b']
+        )
+
+    def reasons(self, fmt):
+        lines = ''.join(export_lines('bookings', fmt, export_queryset('bookings')))
+        if fmt == 'csv':
+            return [row['reason_for_session'] for row in csv.DictReader(io.StringIO(lines))]
+        return [json.loads(line)['reason_for_session'] for line in lines.splitlines()]
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        self.assertEqual(self.reasons('csv'), [
+            '\'=HYPERLINK("http://evil.example")', "'+1", "'-2", "'@SUM(A1)", 'Tax review', 'a=b',
+        ])
+
+    def test_jsonl_keeps_values_as_they_are(self):
+        self.assertEqual(self.reasons('jsonl')[:2], ['=HYPERLINK("http://evil.example")', '+1'])
+
+    async def test_asgi_download_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.client_user)
+        response = await self.async_client.get(reverse('export', args=['bookings', 'jsonl']))
+        self.assertEqual(response.status_code, 200)
+        # A sync iterator would be read whole into memory by the ASGI handler
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.decode().splitlines()), 6)
+
+    def test_wsgi_download_streams(self):
+        self.client.force_login(self.client_user)
+        response = self.client.get(reverse('export', args=['bookings', 'csv']))
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 7)
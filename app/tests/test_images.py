@@ -0,0 +1,113 @@
+import io
+import os
+import re
+import tempfile
+from unittest import skipUnless
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from app.jobs import work_once
+from app.models import CustomUser
+from .utils import make_client
+
+
+def _upload(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('me.png', buffer.getvalue(), content_type='image/png')
+
+
+class ProfilePictureTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = make_client('client')
+        self.client.force_login(self.user)
+
+    def upload(self, color):
+        self.client.post(reverse('update-profile'), {'profile_picture': _upload(color)})
+        while work_once():
+            pass
+        return CustomUser.objects.get(pk=self.user.pk)
+
+    def stored_files(self):
+        return {
+            os.path.relpath(os.path.join(folder, name), self.media_root)
+            for folder, dirs, names in os.walk(self.media_root) for name in names
+        }
+
+    def test_new_picture_replaces_the_old_files(self):
+        first = self.upload('red')
+        self.assertEqual(len(first.profile_picture_variants), 3)
+
+        second = self.upload('blue')
+        expected = {second.profile_picture.name}
+        for formats in second.profile_picture_variants.values():
+            expected.update(formats.values())
+        self.assertEqual(self.stored_files(), expected)
+        self.assertNotEqual(first.profile_picture.name, second.profile_picture.name)
+
+    def test_picture_offers_webp_with_jpeg_fallback(self):
+        user = self.upload('red')
+        html = Template('{% load avatars %}{% avatar_picture user 100 class="round" %}').render(Context({'user': user}))
+        variant = user.profile_picture_variants['128']
+        self.assertInHTML(
+            f'<picture><source srcset="{default_storage.url(variant["webp"])}" type="image/webp">'
+            f'<img src="{default_storage.url(variant["jpeg"])}" class="round"></picture>',
+            html,
+        )
+
+
+@skipUnless(os.getenv('BENCHMARK'), "set BENCHMARK=1 to run")
+class AvatarBytesBenchmark(TestCase):
+    """
+    Bytes a browser downloads for the avatar on one profile page render,
+    with the raw phone photo and then with the processed variants::
+
+        BENCHMARK=1 python manage.py test app.tests.test_images.AvatarBytesBenchmark
+    """
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = make_client('client')
+        self.client.force_login(self.user)
+
+    def avatar_bytes(self):
+        html = self.client.get(reverse('profile')).content.decode()
+        # Let fetch what a WebP-capable browser picks: the <source> if there is one, else the <img>
+        match = re.search(r'<source srcset="([^"]+)"', html) or re.search(r'<img src="(/media/[^"]+)"', html)
+        response = self.client.get(match.group(1))
+        return len(b''.join(response.streaming_content))
+
+    def test_bytes_per_render(self):
+        # A 12 MP phone photo: coarse shapes that survive downscaling plus fine grain like sensor noise
+        coarse = Image.merge('RGB', [Image.effect_noise((63, 84), 90) for _ in range(3)]).resize((3024, 4032), Image.BICUBIC)
+        grain = Image.merge('RGB', [Image.effect_noise((3024, 4032), 12) for _ in range(3)])
+        photo = Image.blend(coarse, grain, 0.3)
+        buffer = io.BytesIO()
+        photo.save(buffer, 'JPEG', quality=92)
+        upload = SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+        self.client.post(reverse('update-profile'), {'profile_picture': upload})
+
+        before = self.avatar_bytes()
+        while work_once():
+            pass
+        after = self.avatar_bytes()
+
+        print(f"\navatar bytes per render: {before:,} uploaded photo, {after:,} with variants "
+              f"({before / after:.0f}x fewer)")
+        self.assertLess(after, before)
@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+from app.media import _parse_range
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        cases = [
+            ('bytes=0-99', 1000, (0, 99)),
+            ('bytes=900-', 1000, (900, 999)),
+            ('bytes=-100', 1000, (900, 999)),
+            ('bytes=-5000', 1000, (0, 999)),
+            ('bytes=500-5000', 1000, (500, 999)),
+            ('bytes=1000-', 1000, False),
+            ('bytes=-0', 1000, False),
+            ('bytes=5-1', 1000, False),
+            ('bytes=0-1,5-9', 1000, None),
+            ('items=0-1', 1000, None),
+        ]
+        for header, size, expected in cases:
+            with self.subTest(header=header, size=size):
+                self.assertEqual(_parse_range(header, size), expected)
+
+    def test_empty_file_has_no_satisfiable_range(self):
+        for header in ('bytes=-1', 'bytes=-100', 'bytes=0-', 'bytes=0-0'):
+            with self.subTest(header=header):
+                self.assertIs(_parse_range(header, 0), False)
@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from app.metrics import MetricsMiddleware, _Registry, _collect, registry
+from app.models import Availability
+
+
+class CollectTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.settings = override_settings(METRICS_DIR=self.dir.name, METRICS_STALE_AFTER=60)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def write(self, pid, count, age=0):
+        entry = _Registry._empty()
+        entry['count'] = count
+        path = os.path.join(self.dir.name, f"metrics-{pid}.json")
+        with open(path, 'w') as f:
+            json.dump({'home': entry}, f)
+        if age:
+            stamp = time.time() - age
+            os.utime(path, (stamp, stamp))
+        return path
+
+    def test_only_live_fresh_workers_are_summed(self):
+        worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+        worker.wait()
+
+        self.write(os.getpid(), 1)
+        self.write(os.getppid(), 10)
+        dead = self.write(worker.pid, 100)
+        # pid 1 is alive, but nothing was written for longer than METRICS_STALE_AFTER
+        old = self.write(1, 1000, age=120)
+
+        self.assertEqual(_collect()['home']['count'], 11)
+        self.assertFalse(os.path.exists(dead))
+        self.assertFalse(os.path.exists(old))
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.sql_counts = []
+        patcher = mock.patch.object(
+            registry, 'observe', lambda view, seconds, stats: self.sql_counts.append(stats.sql_count),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sync_view_queries_are_counted(self):
+        def view(request):
+            Availability.objects.count()
+            Availability.objects.exists()
+            return HttpResponse()
+
+        MetricsMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(self.sql_counts, [2])
+
+    async def test_async_view_queries_are_counted(self):
+        # The ORM runs on sync_to_async's thread, not on the event loop's
+        async def view(request):
+            await Availability.objects.acount()
+            await Availability.objects.aexists()
+            return HttpResponse()
+
+        await MetricsMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(self.sql_counts, [2])
@@ -0,0 +1,48 @@
+from datetime import timedelta
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+from django.utils import timezone
+from app.models import Availability
+from .utils import make_availability, make_consultant
+
+
+class NextPerConsultantTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        for n, days in enumerate([(3, 1, 7), (5,), (2, 2 + 30), ()]):
+            consultant = make_consultant(f"c{n}")
+            for days_ahead in days:
+                make_availability(consultant, days_ahead)
+        # Past availability must never be picked
+        make_availability(consultant, -1)
+
+    def expected(self, from_date):
+        first = {}
+        for slot in Availability.objects.filter(date__gte=from_date).order_by('date'):
+            first.setdefault(slot.consultant_id, slot.id)
+        return set(first.values())
+
+    def test_first_slot_of_every_consultant(self):
+        for offset in (0, 2, 4, 40):
+            from_date = self.today + timedelta(days=offset)
+            slots = list(Availability.objects.next_per_consultant(from_date))
+            self.assertEqual({slot.id for slot in slots}, self.expected(from_date))
+            self.assertEqual([slot.date for slot in slots], sorted(slot.date for slot in slots))
+
+    def fallback(self, from_date):
+        with mock.patch.object(connection.features, 'can_distinct_on_fields', False):
+            return list(Availability.objects.next_per_consultant(from_date).values_list('id', flat=True))
+
+    @skipUnlessDBFeature('can_distinct_on_fields')
+    def test_distinct_on_matches_fallback(self):
+        for offset in (0, 2, 4, 40):
+            from_date = self.today + timedelta(days=offset)
+            distinct_on = list(Availability.objects.next_per_consultant(from_date).values_list('id', flat=True))
+            self.assertEqual(sorted(distinct_on), sorted(self.fallback(from_date)))
+
+    def test_fallback_matches_expected(self):
+        from_date = self.today + timedelta(days=2)
+        self.assertEqual(set(self.fallback(from_date)), self.expected(from_date))
@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import json
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from app.capacity import reserve_booking, set_booking_status
+from app.models import Availability, Booking, Job, Payment, PaymentEvent
+from app.payments import settle_payment
+from app.paystack_stub import start_stub_server
+from .utils import make_availability, make_client, make_consultant
+
+
+class PaymentFlowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        consultant = make_consultant('consultant')
+        cls.client_user = make_client('client')
+        booking = Booking.objects.create(
+            client=cls.client_user, consultant=consultant,
+            availability=make_availability(consultant), reason_for_session='Tax',
+        )
+        cls.payment = Payment.objects.create(booking=booking, amount=500000)
+
+    def webhook(self, payload):
+        body = json.dumps(payload).encode()
+        signature = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse('paystack-webhook'), body, content_type='application/json',
+            headers={'X-Paystack-Signature': signature},
+        )
+
+    def test_webhook_records_event_and_job_once(self):
+        payload = {'event': 'charge.success', 'data': {'reference': str(self.payment.payment_reference)}}
+        self.assertEqual(self.webhook(payload).status_code, 200)
+        self.assertEqual(self.webhook(payload).status_code, 200)
+
+        event = PaymentEvent.objects.get()
+        self.assertQuerySetEqual(
+            Job.objects.values_list('name', 'payload'),
+            [('settle_payment_event', {'event_id': event.id})],
+        )
+
+    def test_refreshing_a_pending_payment_queues_one_check(self):
+        self.client.force_login(self.client_user)
+        reference = str(self.payment.payment_reference)
+        for attempt in range(3):
+            self.client.get(reverse('verify-payment'), {'reference': reference})
+        self.assertEqual(Job.objects.filter(name='verify_payment', payload={'reference': reference}).count(), 1)
+
+        # Once that check has run, a later refresh may ask again
+        Job.objects.update(status=Job.StatusChoices.DONE)
+        self.client.get(reverse('verify-payment'), {'reference': reference})
+        self.assertEqual(Job.objects.filter(name='verify_payment', status=Job.StatusChoices.QUEUED).count(), 1)
+
+
+class SettlePaymentTests(TestCase):
+
+    def setUp(self):
+        self.consultant = make_consultant('consultant')
+        self.availability = make_availability(self.consultant, max_slot=1)
+        self.booking = self.book(make_client('client'))
+        self.payment = Payment.objects.create(booking=self.booking, amount=500000)
+
+    def book(self, client):
+        return reserve_booking(Booking(
+            client=client, consultant=self.consultant,
+            availability=self.availability, reason_for_session='Tax',
+        ))
+
+    def settle(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return settle_payment(str(self.payment.payment_reference), **kwargs)
+
+    def test_success_confirms_pending_booking(self):
+        payment = self.settle(succeeded=True, amount=500000)
+        self.assertEqual(payment.status, Payment.PaymentStatus.SUCCESS)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Booking.StatusChoices.CONFIRMED)
+        self.assertEqual(Availability.objects.get().confirmed_count, 1)
+
+    def test_under_payment_fails(self):
+        self.assertEqual(self.settle(succeeded=True, amount=100).status, Payment.PaymentStatus.FAILED)
+
+    def test_late_success_on_cancelled_and_refilled_slot_is_recorded(self):
+        set_booking_status(self.booking, Booking.StatusChoices.CANCELLED)
+        # Someone else takes the only seat before Paystack reports the charge
+        self.book(make_client('other'))
+
+        with self.assertLogs('app.payments', 'WARNING') as logs:
+            payment = self.settle(succeeded=True, amount=500000)
+
+        self.assertEqual(payment.status, Payment.PaymentStatus.SUCCESS)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.SUCCESS)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Booking.StatusChoices.CANCELLED)
+        availability = Availability.objects.get()
+        self.assertEqual((availability.reserved_count, availability.confirmed_count), (1, 0))
+        self.assertIn('needs a refund', logs.output[0])
+
+        # Settling again is a no-op rather than a retry loop
+        self.assertEqual(self.settle(succeeded=True, amount=500000).status, Payment.PaymentStatus.SUCCESS)
+
+
+class ReconcilePaymentsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The stub answers every verify with a success for 500000
+        cls.server = start_stub_server()
+        cls.addClassCleanup(cls.server.shutdown)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        availability = make_availability(cls.consultant, max_slot=3)
+        cls.payments = {}
+        for name, amount, status in [
+            ('paid', 500000, Payment.PaymentStatus.PENDING),
+            ('short', 900000, Payment.PaymentStatus.PENDING),
+            ('settled', 500000, Payment.PaymentStatus.SUCCESS),
+        ]:
+            booking = reserve_booking(Booking(
+                client=make_client(name), consultant=cls.consultant,
+                availability=availability, reason_for_session='Tax',
+            ))
+            cls.payments[name] = Payment.objects.create(booking=booking, amount=amount, status=status)
+
+    def reconcile(self):
+        host, port = self.server.server_address
+        with override_settings(PAYSTACK_BASE_URL=f"http://{host}:{port}"), \
+                mock.patch('app.payments.publish') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_payments', older_than=0, stdout=StringIO())
+        return publish
+
+    def status(self, name):
+        payment = Payment.objects.select_related('booking').get(pk=self.payments[name].pk)
+        return payment.status, payment.booking.status
+
+    def test_settles_like_the_webhook(self):
+        publish = self.reconcile()
+
+        self.assertEqual(self.status('paid'), (Payment.PaymentStatus.SUCCESS, Booking.StatusChoices.CONFIRMED))
+        # Paystack charged less than the booking costs
+        self.assertEqual(self.status('short'), (Payment.PaymentStatus.FAILED, Booking.StatusChoices.PENDING))
+        # Already settled payments are not checked again
+        self.assertEqual(self.status('settled'), (Payment.PaymentStatus.SUCCESS, Booking.StatusChoices.PENDING))
+
+        self.assertEqual(Availability.objects.get().confirmed_count, 1)
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.args[2]['id'], self.payments['paid'].booking_id)
+
+        # Nothing is left pending, so a second run changes nothing
+        self.reconcile().assert_not_called()
@@ -0,0 +1,70 @@
+import time
+from unittest import mock
+import requests
+from django.test import SimpleTestCase, override_settings
+from app.paystack import PaystackClient, PaystackError, PaystackUnavailable
+
+
+def reply(status_code, body=None):
+    return mock.Mock(status_code=status_code, json=mock.Mock(return_value=body or {}))
+
+
+@override_settings(
+    PAYSTACK_VERIFY_RETRIES=2, PAYSTACK_RETRY_BACKOFF=0,
+    PAYSTACK_BREAKER_THRESHOLD=4, PAYSTACK_BREAKER_RESET=30,
+)
+class PaystackClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.paystack = PaystackClient(secret_key='sk_test', base_url='http://paystack.test')
+        patcher = mock.patch.object(self.paystack.session, 'request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_every_call_has_a_timeout(self):
+        self.request.return_value = reply(200, {'status': True})
+        self.paystack.verify('ref')
+        self.assertEqual(self.request.call_args.kwargs['timeout'], self.paystack.timeout)
+
+    def test_verify_retries_server_errors_and_timeouts(self):
+        self.request.side_effect = [reply(502), requests.Timeout(), reply(200, {'status': True})]
+        self.assertEqual(self.paystack.verify('ref'), {'status': True})
+        self.assertEqual(self.request.call_count, 3)
+
+    def test_verify_gives_up_after_the_retries(self):
+        self.request.side_effect = requests.ConnectionError()
+        with self.assertRaises(PaystackError):
+            self.paystack.verify('ref')
+        self.assertEqual(self.request.call_count, 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.request.return_value = reply(400, {'status': False, 'message': 'Invalid key'})
+        self.assertEqual(self.paystack.verify('ref'), {'status': False, 'message': 'Invalid key'})
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_initialize_is_not_retried(self):
+        self.request.side_effect = requests.Timeout()
+        with self.assertRaises(PaystackError):
+            self.paystack.initialize('a@example.com', 500000, 'ref', 'http://app.test/verify')
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_breaker_opens_and_recovers(self):
+        # One failed initialize and three failed verify attempts reach the threshold of four
+        self.request.return_value = reply(503)
+        with self.assertRaises(PaystackError):
+            self.paystack.initialize('a@example.com', 500000, 'ref', 'http://app.test/verify')
+        with self.assertRaises(PaystackError):
+            self.paystack.verify('ref')
+        self.assertEqual(self.request.call_count, 4)
+
+        # Open: calls fail fast without reaching Paystack
+        with self.assertRaises(PaystackUnavailable):
+            self.paystack.verify('ref')
+        self.assertEqual(self.request.call_count, 4)
+
+        # After the cool-down one trial goes through, and a success closes the breaker
+        self.request.return_value = reply(200, {'status': True})
+        with mock.patch('app.paystack.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertEqual(self.paystack.verify('ref'), {'status': True})
+        self.assertEqual(self.paystack.verify('ref'), {'status': True})
+        self.assertEqual(self.request.call_count, 6)
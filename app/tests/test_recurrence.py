@@ -0,0 +1,64 @@
+from datetime import time, timedelta
+from django.test import TestCase
+from django.utils import timezone
+from app.models import Availability, AvailabilityRule, Consultant_Profile
+from app.recurrence import materialize, next_slots
+from .utils import make_availability, make_consultant
+
+MONDAY, WEDNESDAY = 1 << 0, 1 << 2
+
+
+class NextSlotsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        # Let start from the Monday after tomorrow so every date below is in the future
+        cls.monday = today + timedelta(days=7 - today.weekday())
+        cls.consultant = make_consultant('consultant')
+        cls.rule = AvailabilityRule.objects.create(
+            consultant=cls.consultant, weekdays=MONDAY | WEDNESDAY,
+            start_date=cls.monday, end_date=cls.monday + timedelta(days=27),
+            start_time=time(9), end_time=time(12), max_slot=2,
+        )
+
+    def first(self, from_date=None, **kwargs):
+        slots = next_slots(from_date or self.monday, **kwargs)
+        return slots[0] if slots else None
+
+    def test_rule_dates_follow_the_weekdays(self):
+        with self.assertNumQueries(3):
+            slot = self.first(self.monday + timedelta(days=1))
+        self.assertEqual(slot.date, self.monday + timedelta(days=2))
+        self.assertEqual((slot.start_time, slot.max_slot, slot.rule_id), (time(9), 2, self.rule.pk))
+        # Rule dates are worked out, never written
+        self.assertIsNone(slot.pk)
+        self.assertFalse(Availability.objects.exists())
+
+    def test_full_rule_date_is_skipped(self):
+        materialize(self.rule, self.monday)
+        Availability.objects.update(reserved_count=2)
+        self.assertEqual(self.first().date, self.monday + timedelta(days=2))
+
+    def test_earlier_row_overrides_the_rule(self):
+        row = make_availability(self.consultant, days_ahead=(self.monday - timezone.localdate()).days - 1)
+        self.assertEqual(self.first(row.date).pk, row.pk)
+
+    def test_rule_date_beats_a_later_row(self):
+        make_availability(self.consultant, days_ahead=(self.monday - timezone.localdate()).days + 1)
+        slot = self.first()
+        self.assertEqual((slot.date, slot.pk), (self.monday, None))
+
+    def test_window_and_consultants_narrow_the_search(self):
+        after_rule = self.rule.end_date + timedelta(days=1)
+        self.assertIsNone(self.first(after_rule))
+        self.assertIsNone(self.first(self.monday + timedelta(days=1), to_date=self.monday + timedelta(days=1)))
+
+        other = make_consultant('other')
+        self.assertIsNone(self.first(consultants=Consultant_Profile.objects.filter(pk=other.pk)))
+        self.assertEqual(self.first(consultants=Consultant_Profile.objects.all()).date, self.monday)
+
+    def test_materialize_keeps_one_row_per_date(self):
+        first = materialize(self.rule, self.monday)
+        self.assertEqual(materialize(self.rule, self.monday).pk, first.pk)
+        self.assertEqual(Availability.objects.count(), 1)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSession
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .utils import make_client
+
+
+@override_settings(SESSION_ENGINE='app.sessions')
+class SignedCookieSessionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_client('client')
+
+    def test_database_session_id_is_reissued_as_signed_cookie(self):
+        old = DatabaseSession()
+        old[SESSION_KEY] = str(self.user.pk)
+        old[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        old[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        old.create()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = old.session_key
+
+        response = self.client.get(reverse('book-dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+        # A signed payload, no longer the database id
+        self.assertIn(':', response.cookies[settings.SESSION_COOKIE_NAME].value)
+
+        response = self.client.get(reverse('book-dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_logged_in_request_does_not_read_the_session_table(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book-dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
@@ -0,0 +1,107 @@
+import os
+import random
+import time as clock
+from datetime import datetime, time, timedelta
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from app.models import Availability, Booking, Consultant_Profile, CustomUser
+from app.timeslots import free_windows
+from .utils import make_availability, make_consultant
+
+
+class FreeWindowTests(TestCase):
+
+    def setUp(self):
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def add_day(self, username, start, end):
+        consultant = make_consultant(username)
+        make_availability(consultant, 1, start_time=start, end_time=end)
+        return consultant
+
+    def windows(self, limit):
+        found = free_windows('tax', self.day, self.day, limit)
+        return [(window.slot.consultant.user.username, window.start.time()) for window in found]
+
+    def test_earlier_window_of_a_later_day_is_not_cut_off(self):
+        # a adds two windows before b fills the list; c's 09:00 must still beat a's 09:30
+        self.add_day('a', time(9), time(10))
+        self.add_day('b', time(9), time(9, 30))
+        self.add_day('c', time(9), time(9, 30))
+        self.assertEqual(
+            sorted(self.windows(3)),
+            [('a', time(9)), ('b', time(9)), ('c', time(9))],
+        )
+
+    def test_booked_windows_are_skipped(self):
+        consultant = self.add_day('a', time(9), time(11))
+        start = timezone.make_aware(datetime.combine(self.day, time(9)))
+        Booking.objects.create(
+            client=CustomUser.objects.create(username='client'), consultant=consultant,
+            availability=consultant.availabilities.get(), reason_for_session='Tax',
+            start_at=start, end_at=start + timedelta(minutes=30),
+        )
+        self.assertEqual(self.windows(10), [('a', time(9, 30)), ('a', time(10)), ('a', time(10, 30))])
+
+
+@skipUnless(os.getenv('BENCHMARK'), "set BENCHMARK=1 to run")
+class FreeWindowBenchmark(TestCase):
+    """
+    ``BENCHMARK=1 python manage.py test app.tests.test_timeslots.FreeWindowBenchmark``
+
+    3,000 consultants over five specializations with 60 days of working
+    hours each and the first days partly booked; prints the time and the
+    queries of an earliest-first search.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(1)
+        today = timezone.localdate()
+        specializations = ['tax', 'law', 'design', 'health', 'tech']
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f'u{n}', email=f'u{n}@example.com', role='CONSULTANT') for n in range(3000)
+        )
+        profiles = Consultant_Profile.objects.bulk_create(
+            Consultant_Profile(user=user, specialization=specializations[n % 5]) for n, user in enumerate(users)
+        )
+        Availability.objects.bulk_create(
+            (
+                Availability(
+                    consultant=profile, date=today + timedelta(days=days), max_slot=16,
+                    start_time=time(random.choice([8, 9, 10])), end_time=time(17),
+                )
+                for profile in profiles for days in range(1, 61) if random.random() < 0.7
+            ),
+            batch_size=5000,
+        )
+        bookings = []
+        first_days = Availability.objects.filter(date__lte=today + timedelta(days=5))
+        for slot in first_days.values_list('id', 'consultant_id', 'date', 'start_time'):
+            availability_id, consultant_id, date, start_time = slot
+            opens = timezone.make_aware(datetime.combine(date, start_time))
+            for n in range(random.randint(0, 8)):
+                start = opens + timedelta(minutes=30 * n)
+                bookings.append(Booking(
+                    client_id=users[0].id, consultant_id=consultant_id, availability_id=availability_id,
+                    start_at=start, end_at=start + timedelta(minutes=30), reason_for_session='Benchmark',
+                ))
+        Booking.objects.bulk_create(bookings, batch_size=5000)
+        cls.today = today
+
+    def test_free_windows(self):
+        for limit in (10, 50):
+            free_windows('tax', self.today, self.today + timedelta(days=30), limit)
+            runs = 20
+            with CaptureQueriesContext(connection) as queries:
+                started = clock.perf_counter()
+                for run in range(runs):
+                    found = free_windows('TAX', self.today, self.today + timedelta(days=30), limit)
+                elapsed = (clock.perf_counter() - started) / runs
+            print(f"\nfree_windows limit={limit}: {elapsed * 1000:.1f} ms, "
+                  f"{len(queries) // runs} queries, {len(found)} windows")
+            self.assertEqual(len(found), limit)
+            self.assertEqual([window.start for window in found], sorted(window.start for window in found))
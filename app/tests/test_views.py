@@ -0,0 +1,140 @@
+import os
+import statistics
+import time
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from app.models import Booking, Payment, Review
+from app.pagination import PAGE_SIZE, encode_cursor
+from .utils import make_availability, make_client, make_consultant
+
+
+def _count_queries(queries):
+    return [q['sql'] for q in queries if 'COUNT(' in q['sql'].upper()]
+
+
+class ConsultantDashTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        availability = make_availability(cls.consultant, max_slot=100)
+        client = make_client('client')
+        Booking.objects.bulk_create(
+            Booking(client=client, consultant=cls.consultant, availability=availability, reason_for_session='Tax')
+            for n in range(PAGE_SIZE + 5)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.consultant.user)
+
+    def test_total_is_counted_on_first_page_only(self):
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(reverse('consultant-dash'))
+        self.assertEqual(response.context['total_bookings'], PAGE_SIZE + 5)
+        self.assertEqual(len(_count_queries(first.captured_queries)), 1)
+
+        cursor = response.context['next_cursor']
+        self.assertIsNotNone(cursor)
+        self.assertContains(response, f"total={PAGE_SIZE + 5}")
+
+        with CaptureQueriesContext(connection) as older:
+            response = self.client.get(reverse('consultant-dash'), {'cursor': cursor, 'total': PAGE_SIZE + 5})
+        self.assertEqual(response.context['total_bookings'], PAGE_SIZE + 5)
+        self.assertEqual(len(response.context['all_bookings']), 5)
+        self.assertEqual(_count_queries(older.captured_queries), [])
+
+
+@skipUnless(os.getenv('BENCHMARK'), "set BENCHMARK=1 to run")
+class ConsultantDashBenchmark(TestCase):
+    """
+    ``BENCHMARK=1 python manage.py test app.tests.test_views.ConsultantDashBenchmark``
+
+    Grows one consultant's bookings from 1,000 to 120,000 and prints the
+    median render time of the first dashboard page, which counts the total
+    once, and of a page halfway back through the history, which seeks on
+    its cursor and carries the total in its link.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        cls.availability = make_availability(cls.consultant, max_slot=200000)
+        cls.client_user = make_client('client')
+
+    def setUp(self):
+        self.client.force_login(self.consultant.user)
+
+    def render_ms(self, params, runs=10):
+        self.client.get(reverse('consultant-dash'), params)
+        timings = []
+        for run in range(runs):
+            started = time.perf_counter()
+            response = self.client.get(reverse('consultant-dash'), params)
+            timings.append(time.perf_counter() - started)
+        self.assertEqual(len(response.context['all_bookings']), PAGE_SIZE)
+        return statistics.median(timings) * 1000
+
+    def test_render_time_as_bookings_grow(self):
+        rows = 0
+        for target in (1_000, 10_000, 120_000):
+            Booking.objects.bulk_create(
+                (
+                    Booking(client=self.client_user, consultant=self.consultant,
+                            availability=self.availability, reason_for_session='Benchmark')
+                    for n in range(target - rows)
+                ),
+                batch_size=5000,
+            )
+            rows = target
+            middle = Booking.objects.order_by('-created_at', '-id')[rows // 2]
+            first_page = self.render_ms({})
+            deep_page = self.render_ms({'cursor': encode_cursor(middle), 'total': rows})
+            print(f"\nconsultant_dash with {rows:,} bookings: first page {first_page:.1f} ms, "
+                  f"page {rows // 2 // PAGE_SIZE:,} {deep_page:.1f} ms")
+
+
+class BookDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = make_consultant('consultant')
+        cls.availability = make_availability(cls.consultant, max_slot=100)
+        cls.client_user = make_client('client')
+
+    def setUp(self):
+        self.client.force_login(self.client_user)
+
+    def add_bookings(self, count):
+        for n in range(count):
+            booking = Booking.objects.create(
+                client=self.client_user, consultant=self.consultant, availability=self.availability,
+                reason_for_session='Tax', status=Booking.StatusChoices.COMPLETED,
+            )
+            Payment.objects.create(booking=booking, amount=500000, status=Payment.PaymentStatus.SUCCESS)
+            if n % 2:
+                Review.objects.create(
+                    booking=booking, client=self.client_user, consultant=self.consultant, rating=5, comment='Great',
+                )
+
+    def render(self):
+        # The slot list is a cached fragment; start each render from the same cold cache
+        cache.clear()
+        return self.client.get(reverse('book-dashboard'))
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        self.add_bookings(1)
+        with CaptureQueriesContext(connection) as one:
+            self.render()
+
+        self.add_bookings(9)
+        with self.assertNumQueries(len(one.captured_queries)):
+            response = self.render()
+
+        bookings = response.context['user_bookings']
+        self.assertEqual(len(bookings), 10)
+        self.assertEqual(sum(booking.has_review for booking in bookings), Review.objects.count())
+        self.assertEqual({booking.payment_status for booking in bookings}, {Payment.PaymentStatus.SUCCESS})
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.utils import timezone
+from app.models import Availability, Consultant_Profile, CustomUser
+
+
+def make_consultant(username, specialization='tax', **kwargs):
+    user = CustomUser.objects.create(username=username, email=f"{username}@example.com", role=CustomUser.Role.CONSULTANT)
+    return Consultant_Profile.objects.create(user=user, specialization=specialization, **kwargs)
+
+
+def make_client(username):
+    return CustomUser.objects.create(username=username, email=f"{username}@example.com")
+
+
+def make_availability(consultant, days_ahead=1, **kwargs):
+    return Availability.objects.create(
+        consultant=consultant,
+        date=timezone.now().date() + timedelta(days=days_ahead),
+        **kwargs,
+    )
@@ -0,0 +1,199 @@
+import heapq
+from collections import defaultdict, namedtuple
+from datetime import datetime, time, timedelta
+from itertools import islice
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+from .models import Availability, AvailabilityRule, Booking, Consultant_Profile
+from .recurrence import rule_slot
+
+
+# A bookable window; ``slot`` is the Availability it falls on (unsaved for a rule date)
+FreeWindow = namedtuple('FreeWindow', ['slot', 'start', 'end'])
+
+# Days read per round trip by free_windows(): small first, doubling up to the maximum
+FIRST_SEARCH_CHUNK = 16
+SEARCH_CHUNK = 256
+
+
+def window_length():
+    return timedelta(minutes=settings.BOOKING_WINDOW_MINUTES)
+
+
+def _at(day, clock, tz=None):
+    return datetime.combine(day, clock, tzinfo=tz or timezone.get_current_timezone())
+
+
+def day_windows(slot, busy, length=None, not_before=None):
+    """
+    Free windows of ``length`` in the working hours of ``slot``, on a grid
+    starting at its start time. ``busy`` is the day's booked
+    ``(start, end)`` pairs sorted by start.
+    """
+    length = length or window_length()
+    tz = timezone.get_current_timezone()
+    start = _at(slot.date, slot.start_time, tz)
+    close = _at(slot.date, slot.end_time, tz)
+    i = 0
+    while start + length <= close:
+        end = start + length
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        if (i == len(busy) or busy[i][0] >= end) and (not_before is None or start >= not_before):
+            yield start, end
+        start = end
+
+
+def window_end(slot, start_at):
+    """
+    End of the window starting at ``start_at`` on ``slot``, or a
+    ValidationError if that is not one of its windows.
+    """
+    if slot.start_time is None:
+        if start_at is not None:
+            raise ValidationError("This date is booked as a whole day, without a start time.")
+        return None
+    if start_at is None:
+        raise ValidationError("Pick a start time for this date.")
+
+    length = window_length()
+    opens = _at(slot.date, slot.start_time)
+    end = start_at + length
+    if start_at < opens or end > _at(slot.date, slot.end_time) or (start_at - opens) % length:
+        raise ValidationError("Pick one of the listed start times.")
+    return end
+
+
+def _busy_times(slots):
+    """
+    ``{(consultant_id, date): [(start, end), ...]}`` of the live bookings on these days.
+    """
+    if not slots:
+        return {}
+    first = _at(min(slot.date for slot in slots), time.min)
+    last = _at(max(slot.date for slot in slots) + timedelta(days=1), time.min)
+
+    # Served by the (consultant, start_at) index
+    rows = (
+        Booking.objects
+        .filter(
+            consultant_id__in={slot.consultant_id for slot in slots},
+            start_at__gte=first,
+            start_at__lt=last,
+        )
+        .exclude(status=Booking.StatusChoices.CANCELLED)
+        .order_by('consultant_id', 'start_at')
+        .values_list('consultant_id', 'start_at', 'end_at')
+    )
+    tz = timezone.get_current_timezone()
+    busy = defaultdict(list)
+    for consultant_id, start_at, end_at in rows:
+        busy[(consultant_id, start_at.astimezone(tz).date())].append((start_at, end_at))
+    return busy
+
+
+def open_windows(slot):
+    """
+    Windows of one day that are still free, for the booking form.
+    """
+    busy = _busy_times([slot]).get((slot.consultant_id, slot.date), [])
+    return list(day_windows(slot, busy, not_before=timezone.now()))
+
+
+def _rule_days(rule, date_from, date_to):
+    for day in rule.dates(date_from, date_to):
+        yield rule_slot(rule, day)
+
+
+def _drop_booked_rule_days(slots):
+    # A rule date that already has a row is read from the row (or skipped if the row is full)
+    rule_days = [slot for slot in slots if slot.pk is None]
+    if not rule_days:
+        return slots
+    rows = set(
+        Availability.objects.filter(
+            consultant_id__in={slot.consultant_id for slot in rule_days},
+            date__in={slot.date for slot in rule_days},
+        ).values_list('consultant_id', 'date')
+    )
+    return [slot for slot in slots if slot.pk is not None or (slot.consultant_id, slot.date) not in rows]
+
+
+def free_windows(specialization, date_from, date_to, limit=10):
+    """
+    The first ``limit`` free windows of active consultants in
+    ``specialization`` between two dates, earliest first.
+
+    Working days (Availability rows and recurring rule dates) are read in
+    (date, start time) order, in chunks that start small and double. The
+    search stops as soon as no later day can open before the windows
+    already found, so a query near today touches a handful of days whatever
+    the number of consultants.
+    """
+    length = window_length()
+    now = timezone.now()
+    profiles = Consultant_Profile.objects.filter(is_active=True, specialization__iexact=specialization)
+
+    rows = (
+        Availability.objects
+        .filter(
+            consultant__in=profiles,
+            date__range=(date_from, date_to),
+            start_time__isnull=False,
+            reserved_count__lt=F('max_slot'),
+        )
+        # Narrow rows for the scan; consultants are only loaded for the windows returned
+        .only('id', 'consultant_id', 'date', 'start_time', 'end_time', 'max_slot', 'rule_id')
+        .order_by('date', 'start_time', 'id')
+        .iterator(chunk_size=SEARCH_CHUNK)
+    )
+    rules = AvailabilityRule.objects.filter(
+        consultant__in=profiles,
+        start_date__lte=date_to,
+        end_date__gte=date_from,
+        start_time__isnull=False,
+    )
+
+    days = heapq.merge(
+        rows,
+        *(_rule_days(rule, date_from, date_to) for rule in rules),
+        key=lambda slot: (slot.date, slot.start_time),
+    )
+
+    found = []
+    chunk_size = max(FIRST_SEARCH_CHUNK, limit)
+    while True:
+        chunk = list(islice(days, chunk_size))
+        chunk_size = min(chunk_size * 2, SEARCH_CHUNK)
+        if not chunk:
+            break
+        last = chunk[-1]
+        chunk = _drop_booked_rule_days(chunk)
+
+        busy = _busy_times(chunk)
+        for slot in chunk:
+            # A day adds at most `limit` windows, and none later than the latest one kept;
+            # `found` is only sorted after each day, so that is its max, not its last entry
+            cutoff = max(window.start for window in found) if len(found) == limit else None
+            windows = day_windows(slot, busy.get((slot.consultant_id, slot.date), []), length, now)
+            for start, end in islice(windows, limit):
+                if cutoff is not None and start >= cutoff:
+                    break
+                found.append(FreeWindow(slot, start, end))
+            if len(found) > limit:
+                found.sort(key=lambda window: window.start)
+                del found[limit:]
+        found.sort(key=lambda window: window.start)
+
+        # Every later day opens at or after the last one read
+        if len(found) == limit and found[-1].start <= _at(last.date, last.start_time):
+            break
+
+    consultants = Consultant_Profile.objects.select_related('user').in_bulk(
+        {window.slot.consultant_id for window in found}
+    )
+    for window in found:
+        window.slot.consultant = consultants[window.slot.consultant_id]
+    return found
@@ -1,8 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from . import views
-from django.conf import settings
+from .events import consultant_events
+from .exports import export_records
+from .media import serve_media
+from .metrics import metrics_view
 from django.urls import re_path
-from django.views.static import serve
+
+
+# Let serve the Paystack round-trips from async views when running under an ASGI server
+if settings.ASYNC_PAYMENTS:
+    from . import async_views as payment_views
+else:
+    payment_views = views
 
 
 urlpatterns = [
@@ -12,16 +22,21 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('book-dashboard/', views.book_dashboard, name='book-dashboard'),
     path('book-session/<int:availability_id>/', views.book_session, name='book-session'),
+    path('book-session/<int:rule_id>/<str:date>/', views.book_rule_session, name='book-rule-session'),
     path('update-status/<int:booking_id>/', views.update_booking_status, name='update-status'),
 
     path('consultant-dash', views.consultant_dash, name='consultant-dash'),
+    # Live dashboard updates (server-sent events)
+    path('consultant-dash/events/', consultant_events, name='consultant-events'),
     path('availability-slot/', views.availability_slot, name='availability-slot'),
     path('update-link/<int:booking_id>/', views.update_meeting_link, name='update-link'),
 
     # Now let add payment urls
-    path('pay/<int:booking_id>/', views.initialize_payment, name='initialize-payment'),
-    path('verify-payment/', views.verify_payment, name='verify-payment'),
+    path('pay/<int:booking_id>/', payment_views.initialize_payment, name='initialize-payment'),
+    path('verify-payment/', payment_views.verify_payment, name='verify-payment'),
+    path('paystack/webhook/', views.paystack_webhook, name='paystack-webhook'),
     path('payment-dash/', views.payment_dash, name='payment-dash'),
+    path('export/<slug:kind>.<slug:fmt>', export_records, name='export'),
 
 
     # Let path for client profile
@@ -37,11 +52,15 @@ urlpatterns = [
 
     path('forgot-password/', views.forgot_password_step1, name='forgot_password_step1'),
     path('forgot-password/reset/<int:user_id>/', views.forgot_password_step2, name='forgot_password_step2'),
+
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
     
 
 ] 
 
 
 urlpatterns += [
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    # Uploaded files, handed to nginx when MEDIA_SENDFILE_HEADER is set
+    re_path(r'^media/(?P<path>.*)$', serve_media, name='media'),
 ]
\ No newline at end of file
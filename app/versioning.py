@@ -0,0 +1,50 @@
+from datetime import datetime, timezone as dt_timezone
+from django.db.models import F
+from django.utils import timezone
+from .models import ChangeStamp
+
+
+# Scopes of the version stamps; owner ids are user or consultant profile ids
+CLIENT_BOOKINGS = 'client-bookings'
+CONSULTANT_BOOKINGS = 'consultant-bookings'
+AVAILABILITIES = 'availabilities'
+PROFILES = 'profiles'           # single global stamp, owner id 0
+
+# Served for a stamp that was never bumped; its first bump creates the row at version 1
+UNCHANGED = (0, datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+
+
+def get_stamp(scope, owner_id):
+    """
+    Current ``(version, changed_at)`` for ``scope``/``owner_id``.
+
+    Read only, so a conditional GET never writes; a missing row reads as ``UNCHANGED``.
+    """
+    stamp = ChangeStamp.objects.filter(scope=scope, owner_id=owner_id).values_list('version', 'changed_at').first()
+    return stamp or UNCHANGED
+
+
+def bump_stamps(scope, owner_ids):
+    """
+    Mark everything in ``scope`` for these owners as changed.
+
+    Missing stamps are inserted first, so every bump moves the version past
+    ``UNCHANGED``. ``owner_ids`` may be any iterable of ids, including a
+    ``values_list(..., flat=True)`` queryset.
+    """
+    owner_ids = set(owner_ids)
+    if not owner_ids:
+        return
+    now = timezone.now()
+    ChangeStamp.objects.bulk_create(
+        [ChangeStamp(scope=scope, owner_id=owner_id, changed_at=now) for owner_id in owner_ids],
+        ignore_conflicts=True,
+    )
+    ChangeStamp.objects.filter(scope=scope, owner_id__in=owner_ids).update(
+        version=F('version') + 1,
+        changed_at=now,
+    )
+
+
+def bump_stamp(scope, owner_id):
+    bump_stamps(scope, [owner_id])
@@ -1,9 +1,9 @@
 from django.shortcuts import render, redirect
-from .models import Availability, Booking, CustomUser, Payment, Consultant_Profile, Review
+from .models import Availability, AvailabilityRule, Booking, CustomUser, Payment, PaymentEvent, Consultant_Profile, Review
 from .forms import (
     UserRegisterForm, ConsultantProfileForm, UserUpdateForm,
     AvailabilityForm, BookingForm, PaymentForm, ReviewForm, 
-    AvailabilityFormSet, ClientProfilePicForm, ConsultantProfilePicForm
+    AvailabilityFormSet, AvailabilityRuleForm, ClientProfilePicForm, ConsultantProfilePicForm
 )
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
@@ -11,13 +11,29 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.utils import timezone
-import requests
+from django.utils.dateparse import parse_date
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 import uuid
 from django.views.decorators.http import require_POST
-from django.db.models import Avg
+from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpResponse
+import hashlib
+import hmac
+import json
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
+from .capacity import SlotFull, reserve_booking, set_booking_status
+from .pagination import keyset_page
+from .paystack import PaystackError, get_client
+from .jobs import enqueue, enqueue_once
+from .caching import listing_key
+from .images import picture_files
+from .recurrence import materialize, next_slots, rule_slot
+from .timeslots import open_windows, window_end
+from functools import partial
 
 
 
@@ -60,72 +76,158 @@ def logout_view(request):
 
 @login_required
 def book_dashboard(request):
-    user_bookings = Booking.objects.filter(client=request.user)
+    # Let load the consultant chain and the review/payment flags the cards need in one query
+    user_bookings = list(
+        Booking.objects.filter(client=request.user)
+        .select_related('consultant__user', 'availability')
+        .annotate(
+            has_review=Exists(Review.objects.filter(booking=OuterRef('pk'))),
+            payment_status=F('payment__status'),
+        )
+        .order_by('-created_at')
+    )
     
-    # Let get availability slot based on recent one by the consultant
-    all_slots = Availability.objects.filter(date__gte=timezone.now().date()).order_by('date')
-
-    # Let make dictionary trick that ensures only one slot per consultant is show
-    unique_slots = {}
-    for slot in all_slots:
-        if slot.consultant_id not in unique_slots:
-            unique_slots[slot.consultant_id] = slot
-            
-    availability_list = unique_slots.values()
+    # Let get the next upcoming slot of each consultant, from their dates or their recurring rules.
+    # Templates call callables, so next_slots only runs when the cached fragment is rebuilt
+    today = timezone.now().date()
+    availability_list = partial(next_slots, today)
     
     context = {
         'user_bookings': user_bookings,
+        'booking_count': len(user_bookings),
         'availability_list': availability_list,
+        # The slot list is the same for every client, so its rendered HTML is cached
+        'slots_cache_key': listing_key('next-slots', today),
     }
     return render(request, 'app/book_dashboard.html', context)
 
 
 
+def _windows(availability):
+    return open_windows(availability) if availability.start_time else None
+
+
+def _reserve(request, form, availability):
+    booking = form.save(commit=False)
+    booking.client = request.user
+    booking.availability = availability
+    booking.consultant = availability.consultant
+    if availability.start_time:
+        booking.start_at = form.cleaned_data['start_at']
+        try:
+            booking.end_at = window_end(availability, booking.start_at)
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect("book-dashboard")
+    try:
+        reserve_booking(booking)
+    except SlotFull as e:
+        messages.error(request, str(e))
+        return redirect("book-dashboard")
+    messages.success(request, "Session successfully booked, click Pay.")
+    return redirect("book-dashboard")
+
+
 @login_required       
 def book_session(request, availability_id):
 
     availability = get_object_or_404(Availability, id=availability_id)
     # Let handle booking session here
     if request.method == "POST":
-        form = BookingForm(request.POST)
+        form = BookingForm(request.POST, windows=_windows(availability))
 
         if form.is_valid():
-            booking = form.save(commit=False)
-            booking.client = request.user
-            booking.availability = availability
-            booking.consultant = availability.consultant
-            booking.save()
-            messages.success(request, "Session successfully booked, click Pay.")
-            return redirect("book-dashboard")
+            return _reserve(request, form, availability)
 
     else:
-        form = BookingForm()
+        form = BookingForm(windows=_windows(availability))
 
     return render(request, "app/book_session.html", {"form": form})
 
 
+@login_required
+def book_rule_session(request, rule_id, date):
+    rule = get_object_or_404(AvailabilityRule, id=rule_id)
+    day = _parse_date(date)
+    if day is None or day < timezone.now().date() or not rule.occurs_on(day):
+        messages.error(request, "That date is not available, please pick another one.")
+        return redirect("book-dashboard")
+
+    # The date may have been booked (and given its row) since the link was rendered
+    slot = Availability.objects.filter(consultant_id=rule.consultant_id, date=day).first() or rule_slot(rule, day)
+
+    if request.method == "POST":
+        form = BookingForm(request.POST, windows=_windows(slot))
+
+        if form.is_valid():
+            # Let create the concrete slot only now that someone books it
+            return _reserve(request, form, slot if slot.pk else materialize(rule, day))
+
+    else:
+        form = BookingForm(windows=_windows(slot))
+
+    return render(request, "app/book_session.html", {"form": form})
+
+
+def _parse_date(value):
+    # Let ignore malformed dates in query strings instead of failing the page
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
 @login_required
 def consultant_dash(request):
-    
+    all_bookings = []
+    next_cursor = None
+    total_bookings = 0
+    avg_rating = []
+    rating_histogram = []
+    reviews = []
+
+    status = request.GET.get('status', '')
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+
     if request.user.role == 'CONSULTANT':
-        
-        all_bookings = Booking.objects.all().order_by('-created_at')
-        avg_rating = Review.objects.filter(
-        consultant__user=request.user
-        ).aggregate(Avg('rating'))['rating__avg']
+
+        # Let only show bookings made for this consultant, with everything the table renders
+        bookings = Booking.objects.filter(consultant__user=request.user).select_related(
+            'client', 'consultant__user', 'availability'
+        ).annotate(payment_status=F('payment__status'))
+
+        # Filters are applied in the database, not in the template
+        if status in Booking.StatusChoices.values:
+            bookings = bookings.filter(status=status)
+        if _parse_date(date_from):
+            bookings = bookings.filter(availability__date__gte=_parse_date(date_from))
+        if _parse_date(date_to):
+            bookings = bookings.filter(availability__date__lte=_parse_date(date_to))
+
+        cursor = request.GET.get('cursor')
+        all_bookings, next_cursor = keyset_page(bookings, cursor)
+        # Let count once on the first page; older pages carry that total in their link
+        total = request.GET.get('total', '')
+        total_bookings = int(total) if cursor and total.isdigit() else bookings.count()
+
+        # Let read the maintained rating aggregates instead of averaging every review
+        profile = Consultant_Profile.objects.filter(user=request.user).first()
+        if profile is not None:
+            avg_rating = profile.average_rating
+            rating_histogram = profile.rating_histogram
         reviews = Review.objects.filter(
         consultant__user=request.user
-        ).order_by('-created_at')
-        
-    else:
-
-        all_bookings = []
-        avg_rating = []
-        reviews = []
+        ).select_related('client').order_by('-created_at')
 
     return render(request, 'app/consultant_dashboard.html', {
         'all_bookings': all_bookings,
+        'total_bookings': total_bookings,
+        'next_cursor': next_cursor,
+        'status_choices': Booking.StatusChoices.choices,
+        'filters': {'status': status, 'date_from': date_from, 'date_to': date_to},
         'avg_rating': avg_rating,
+        'rating_histogram': rating_histogram,
         'reviews': reviews,
     })
 
@@ -134,14 +236,17 @@ def consultant_dash(request):
 @require_POST
 @login_required
 def update_booking_status(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
+    # Only the assigned consultant can change the status of a booking
+    booking = get_object_or_404(Booking, id=booking_id, consultant__user=request.user)
     
     new_status = request.POST.get('status')
     
     # Check if the submitted status is valid based on your model choices
     if new_status in [choice[0] for choice in Booking.StatusChoices.choices]:
-        booking.status = new_status
-        booking.save()
+        try:
+            set_booking_status(booking, new_status)
+        except SlotFull as e:
+            messages.error(request, str(e))
         
     return redirect('consultant-dash')
 
@@ -164,13 +269,11 @@ def update_meeting_link(request, booking_id):
 
 
 
-@login_required
-def initialize_payment(request, booking_id):
-
+def _booking_payment(user, booking_id):
     booking = get_object_or_404(
         Booking,
         id=booking_id,
-        client=request.user,
+        client=user,
         status=Booking.StatusChoices.PENDING
     )
     
@@ -181,49 +284,55 @@ def initialize_payment(request, booking_id):
         booking =booking,
         amount= amount,
     )
+    return payment
+
+
+def _checkout_redirect(request, response_data):
+    # Let check one time before redirecting
+    if response_data.get("status"):
+        return redirect(response_data["data"]["authorization_url"])
+
+    messages.error(request, f"Paystack error: {response_data.get('message')}")
+    return redirect("book-dashboard")
+
+
+def _check_payment(request, user, reference):
+    # Paystack confirms through the webhook, so this is only a local lookup of the settled state
+    payment = get_object_or_404(Payment, payment_reference=reference, booking__client=user)
+
+    if payment.status == Payment.PaymentStatus.SUCCESS:
+        messages.success(request, "Payment successful! Your Booking is confirmed.")
+    elif payment.status == Payment.PaymentStatus.FAILED:
+        messages.error(request, "Payment verification failed. Please contact support.")
+    else:
+        # Let ask a worker to check with Paystack in case the webhook is slow or never comes,
+        # once per reference however often the page is refreshed
+        enqueue_once("verify_payment", reference=reference)
+        messages.info(request, "We are confirming your payment, your booking will update shortly.")
+
+
+@login_required
+def initialize_payment(request, booking_id):
+    payment = _booking_payment(request.user, booking_id)
 
     # Now let prevent user from double payment
     if payment.status == Payment.PaymentStatus.SUCCESS:
         print("payment has been made")
         return redirect("book-dashboard")
 
-    # Let handle Paystack API Setup
-    url = "https://api.paystack.co/transaction/initialize"
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    # Let attempt to initialize
-    payload = {
-        "email": request.user.email,
-        "amount": int(payment.amount),
-        "reference": str(payment.payment_reference),
-        "callback_url": request.build_absolute_uri("/verify-payment/"),
-    }
-
-    # Right here let call Paystack initialize endpoint
+    # Right here let call Paystack initialize endpoint through the pooled client
     try:
-        response = requests.post(
-            url, 
-            json=payload,
-            headers=headers,
+        response_data = get_client().initialize(
+            email=request.user.email,
+            amount=payment.amount,
+            reference=payment.payment_reference,
+            callback_url=request.build_absolute_uri("/verify-payment/"),
         )
-        response_data = response.json()
-
-        # print("Response:", response_data)
-
-        # Let check one time before redirecting
-        if response_data.get("status"):
-            return redirect(response_data["data"]["authorization_url"])
-        else:    
-            messages.error(request, f"Paystac error: {response_data.get('message')}")   
-            return redirect("book-dashboard")
-    except Exception as e:
-
-        messages.error(request, f"Connrection Error: {str(e)}")
+    except PaystackError as e:
+        messages.error(request, f"Connection Error: {str(e)}")
+        return redirect("book-dashboard")
 
-    return redirect("book-dashboard")
+    return _checkout_redirect(request, response_data)
 
 
 @login_required
@@ -232,43 +341,40 @@ def verify_payment(request):
 
     if not reference:
         messages.error(request, "No payment reference found")
-        return redirect("book-dashbaord")
-    
-    # Now let call Paystack to verify the status
-    url = f"https://api.paystack.co/transaction/verify/{reference}"
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-    }
-
-
-    response = requests.get(
-        url,
-        headers=headers
-    )
-    response_data = response.json()
+        return redirect("book-dashboard")
 
+    _check_payment(request, request.user, reference)
+    return redirect("book-dashboard")
 
-    if response_data.get("status") and response_data["data"]["status"] == "success":
-        
-        # Let update the database here
-        payment = get_object_or_404(Payment, payment_reference=reference)
 
-        if payment.status != Payment.PaymentStatus.SUCCESS:
-            payment.status = Payment.PaymentStatus.SUCCESS
-            payment.paid_at = timezone.now()
-            payment.save()
+@csrf_exempt
+@require_POST
+def paystack_webhook(request):
+    # Let reject anything that was not signed with our Paystack secret key
+    signature = request.headers.get("X-Paystack-Signature", "")
+    expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), request.body, hashlib.sha512).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        return HttpResponse(status=401)
 
-            # Now let update the book status
-            booking = payment.booking
-            booking.status = Booking.StatusChoices.CONFIRMED
-            booking.save()
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+
+    reference = (payload.get("data") or {}).get("reference")
+    if reference:
+        # Record it once and acknowledge straight away, settlement happens off-request.
+        # One transaction, so an event is never stored without its job
+        with transaction.atomic():
+            event, created = PaymentEvent.objects.get_or_create(
+                payment_reference=reference,
+                event=payload.get("event", ""),
+                defaults={"payload": payload},
+            )
+            if created:
+                enqueue("settle_payment_event", event_id=event.id)
+    return HttpResponse(status=200)
 
-            messages.success(request, "Payment successful! Your Booking is confirmed.")
-            return redirect('book-dashboard')
-        else:
-            messages.error(request, "Payment verification failed. Please contact support.")
-    return redirect("book-dashboard")
-   
 
 
 @login_required
@@ -341,19 +447,36 @@ def availability_slot(request):
 
     profile, created = Consultant_Profile.objects.get_or_create(user=user)
 
-    if request.method == 'POST':
+    formset = AvailabilityFormSet(instance=profile)
+    rule_form = AvailabilityRuleForm()
+
+    if request.method == 'POST' and 'delete_rule' in request.POST:
+        # Dates already booked keep their Availability row, only future dates go away
+        AvailabilityRule.objects.filter(pk=request.POST['delete_rule'], consultant=profile).delete()
+        messages.success(request, "Recurring availability removed.")
+        return redirect('availability-slot')
+
+    elif request.method == 'POST' and 'add_rule' in request.POST:
+        rule_form = AvailabilityRuleForm(request.POST)
+        if rule_form.is_valid():
+            rule = rule_form.save(commit=False)
+            rule.consultant = profile
+            rule.save()
+            messages.success(request, "Recurring availability added!")
+            return redirect('availability-slot')
+
+    elif request.method == 'POST':
         # Let use the Form to handle multiple date inputs
         formset = AvailabilityFormSet(request.POST, instance=profile)
         if formset.is_valid():
             formset.save()
             messages.success(request, "Availability slots updated!")
             return redirect('availability-slot')
-    else:
-        
-        formset = AvailabilityFormSet(instance=profile)
 
     return render(request, 'app/availability_slot.html', {
         'formset': formset,
+        'rule_form': rule_form,
+        'rules': profile.availability_rules.order_by('start_date'),
         'profile': profile
     })
 
@@ -403,9 +526,20 @@ def update_profile(request):
 
     if request.method == 'POST':
         
+        # Let note the current files before the form puts the new upload on the user
+        old_files = picture_files(request.user)
         form = form_class(request.POST, request.FILES, instance=request.user)
         if form.is_valid():
-            form.save()
+            if 'profile_picture' in form.changed_data:
+                # Variants of the old picture no longer apply, templates use the upload until the job is done
+                form.instance.profile_picture_variants = {}
+            with transaction.atomic():
+                user = form.save()
+                if 'profile_picture' in form.changed_data:
+                    if old_files:
+                        enqueue("delete_files", names=old_files)
+                    if user.profile_picture:
+                        enqueue("process_profile_picture", user_id=user.id, picture=user.profile_picture.name)
             messages.success(request, "Updated")
             return redirect('profile')
     else:
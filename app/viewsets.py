@@ -1,37 +1,293 @@
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from rest_framework.mixins import ListModelMixin
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from datetime import timedelta
+import hashlib
 from .permissions import IsConsultant, IsClient
-from .models import Booking, Availability
-from .serializers import BookingSerializer, AvailabilitySerializer
+from .models import Booking, Availability, Consultant_Profile
+from .serializers import BookingSerializer, AvailabilitySerializer, ConsultantSerializer, FreeWindowSerializer, MatchSerializer, query_list
+from .pagination import CreatedAtCursorPagination, RankCursorPagination
+from .search import search_consultants
+from .recurrence import materialize, next_slots
+from .timeslots import free_windows
+from .versioning import (
+    AVAILABILITIES, CLIENT_BOOKINGS, CONSULTANT_BOOKINGS, PROFILES,
+    get_stamp,
+)
+from .capacity import SlotFull, WindowTaken, claim_seat, claim_window, move_booking, delete_booking, window_constraint
+from .caching import consultant_key, get_or_build, listing_key, specialization_key
 
 
 
-class AvailabilityViewSet(ModelViewSet):
+def with_expansions(queryset, request):
+    # Let join whatever ?expand= asks for so a page never lazy-loads per row
+    if 'consultant' in query_list(request, 'expand'):
+        queryset = queryset.select_related('consultant__user')
+    return queryset
+
+
+def consultant_profile_id(user):
+    # Let not fail for a consultant without a profile; 0 is never a profile id, so its lists stay empty
+    return Consultant_Profile.objects.filter(user=user).values_list('id', flat=True).first() or 0
+
+
+class ConditionalListMixin:
+    """
+    ETag / Last-Modified on list responses.
+
+    The validators come from the version stamps in app.versioning, so an
+    unchanged poll is answered with 304 before the queryset or the
+    serializer is touched. Every viewset using it defines
+    ``get_list_stamps()``, returning the ``(scope, owner_id)`` pairs its list
+    depends on; that is checked when the class is defined.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'get_list_stamps', None)):
+            raise ImproperlyConfigured(f"{cls.__name__} must define get_list_stamps()")
+
+    def list(self, request, *args, **kwargs):
+        stamps = self.get_list_stamps()
+        if 'consultant' in query_list(request, 'expand'):
+            stamps.append((PROFILES, 0))
+
+        versions = [get_stamp(scope, owner_id) for scope, owner_id in stamps]
+        # Let vary the tag with the user and the query string (cursor, fields, expand)
+        raw = f"{request.user.pk}|{request.GET.urlencode()}|" + "|".join(str(version) for version, _ in versions)
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        last_modified = int(max(changed_at for _, changed_at in versions).timestamp())
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class CachedListMixin:
+    """
+    Keep serialized list pages in the cache under ``get_list_cache_key()``.
+
+    Put it after ConditionalListMixin, so 304s are still answered first.
+    """
+
+    def get_list_cache_key(self):
+        # Per user and per absolute URL (cursor, ?fields=/?expand=, host in the page links),
+        # dropped on any consultant change; override with a narrower key where one fits
+        return listing_key(f"api-{self.basename}", self.request.user.pk, self.request.build_absolute_uri())
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+        data = get_or_build(self.get_list_cache_key(), lambda: parent.list(request, *args, **kwargs).data)
+        return Response(data)
+
+
+class AvailabilityViewSet(ConditionalListMixin, CachedListMixin, ModelViewSet):
     queryset = Availability.objects.all()
     serializer_class = AvailabilitySerializer
     # ONLY Consultants can even see this endpoint exists/works
     permission_classes = [IsConsultant] 
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return Availability.objects.filter(consultant__user=self.request.user)
+        queryset = Availability.objects.filter(consultant__user=self.request.user)
+        return with_expansions(queryset, self.request)
+
+    @cached_property
+    def profile_id(self):
+        return consultant_profile_id(self.request.user)
+
+    def get_list_stamps(self):
+        return [(AVAILABILITIES, self.profile_id)]
+
+    def get_list_cache_key(self):
+        # The absolute URL carries the cursor, ?fields= / ?expand= and the host used in the page links
+        return consultant_key(self.profile_id, 'api-availabilities', self.request.build_absolute_uri())
 
     def perform_create(self, serializer):
         serializer.save(consultant=self.request.user.profile)
 
-class BookingViewSet(ModelViewSet):
+class BookingViewSet(ConditionalListMixin, ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     # Let allow only client to be able to use booking api
     permission_classes = [IsClient]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
         if user.role == 'CONSULTANT':
             # Consultants see bookings made for their slots
-            return Booking.objects.filter(availability__consultant__user=user)
-        # Clients see bookings they created
-        return Booking.objects.filter(client=user)
+            queryset = Booking.objects.filter(availability__consultant__user=user)
+        else:
+            # Clients see bookings they created
+            queryset = Booking.objects.filter(client=user)
+        return with_expansions(queryset, self.request)
+
+    def get_list_stamps(self):
+        user = self.request.user
+        if user.role == 'CONSULTANT':
+            return [(CONSULTANT_BOOKINGS, consultant_profile_id(user))]
+        return [(CLIENT_BOOKINGS, user.id)]
+
+    def _materialize(self, serializer):
+        # A rule date is validated on an unsaved Availability; its row is written with the booking
+        availability = serializer.validated_data.get('availability')
+        if availability is not None and availability.pk is None:
+            availability = materialize(availability.rule, availability.date)
+            serializer.validated_data['availability'] = availability
+        return availability
 
     def perform_create(self, serializer):
-        serializer.save(client=self.request.user)
+        try:
+            # Let claim the seat, insert the booking and check its time in one short transaction
+            with transaction.atomic():
+                availability = self._materialize(serializer)
+                claim_seat(availability.pk)
+                with window_constraint():
+                    booking = serializer.save(client=self.request.user)
+                claim_window(booking)
+        except WindowTaken as e:
+            raise ValidationError({'start_at': [str(e)]})
+        except SlotFull as e:
+            raise ValidationError({'availability': [str(e)]})
+
+    def perform_update(self, serializer):
+        # Let keep the counters on the right slot if the booking moves
+        old_availability_id = serializer.instance.availability_id
+        try:
+            with transaction.atomic():
+                self._materialize(serializer)
+                with window_constraint():
+                    booking = serializer.save()
+                move_booking(booking, old_availability_id)
+                if booking.status != Booking.StatusChoices.CANCELLED:
+                    claim_window(booking)
+        except WindowTaken as e:
+            raise ValidationError({'start_at': [str(e)]})
+        except SlotFull as e:
+            raise ValidationError({'availability': [str(e)]})
+
+    def perform_destroy(self, instance):
+        delete_booking(instance)
+
+
+class ConsultantSearchViewSet(ListModelMixin, GenericViewSet):
+    """
+    Find consultants by expertise, bio or name.
+
+    ``?q=`` search terms, ``?is_active=false`` for inactive profiles (or
+    ``any``), ``?available=true`` to keep only consultants with an open
+    upcoming slot.
+    """
+    serializer_class = ConsultantSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = RankCursorPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        is_active = params.get('is_active', 'true').lower()
+        return search_consultants(
+            q=params.get('q', ''),
+            is_active=None if is_active == 'any' else is_active != 'false',
+            available=params.get('available', '').lower() in ('1', 'true'),
+        )
+
+
+class DateWindowMixin:
+    """
+    Reads ``?specialization=``, ``?date_from=``/``?date_to=`` and ``?limit=``
+    for the search endpoints over one specialization.
+    """
+    max_days = 90
+    max_limit = 50
+    default_days = 14
+    default_limit = 10
+
+    def _date_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: ["Use the YYYY-MM-DD format."]})
+        return day
+
+    def get_search_params(self):
+        params = self.request.query_params
+        specialization = params.get('specialization', '').strip()
+        if not specialization:
+            raise ValidationError({'specialization': ["This parameter is required."]})
+
+        today = timezone.now().date()
+        date_from = max(self._date_param('date_from', today), today)
+        date_to = self._date_param('date_to', date_from + timedelta(days=self.default_days))
+        if date_to < date_from or (date_to - date_from).days > self.max_days:
+            raise ValidationError({'date_to': [f"Pick a date_to within {self.max_days} days after date_from."]})
+
+        try:
+            limit = min(max(int(params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': ["A whole number is required."]})
+
+        return specialization, date_from, date_to, limit
+
+
+class FreeWindowViewSet(DateWindowMixin, GenericViewSet):
+    """
+    First free booking windows of a specialization, earliest first.
+
+    ``?specialization=`` (required, any case), ``?date_from=`` and
+    ``?date_to=`` (default today and two weeks on, at most 90 days apart),
+    ``?limit=`` (default 10, at most 50).
+    """
+    serializer_class = FreeWindowSerializer
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request, *args, **kwargs):
+        specialization, date_from, date_to, limit = self.get_search_params()
+        windows = free_windows(specialization, date_from, date_to, limit)
+        return Response({'results': self.get_serializer(windows, many=True).data})
+
+
+class MatchViewSet(DateWindowMixin, GenericViewSet):
+    """
+    Active consultants of a specialization with a free seat between two
+    dates, the one available earliest first, each with that first slot.
+
+    Same parameters as the free-window search. Answers are cached for
+    ``MATCH_CACHE_TIMEOUT`` seconds per specialization and date window and
+    dropped as soon as an availability or booking of that specialization changes.
+    """
+    serializer_class = MatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request, *args, **kwargs):
+        specialization, date_from, date_to, limit = self.get_search_params()
+        key = specialization_key(specialization, 'api-match', date_from, date_to)
+
+        def build():
+            # Built for max_limit so every ?limit= is a slice of the same entry
+            consultants = Consultant_Profile.objects.filter(is_active=True, specialization__iexact=specialization)
+            slots = next_slots(date_from, date_to, consultants)[:self.max_limit]
+            return self.get_serializer(slots, many=True).data
 
+        results = get_or_build(key, build, timeout=settings.MATCH_CACHE_TIMEOUT)
+        return Response({'results': results[:limit]})
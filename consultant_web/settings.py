@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 from django.contrib.messages import constants as messages
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'drf_spectacular',
     'app',
@@ -32,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -126,6 +129,20 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# The worker writes the profile picture variants, so it must see the same media as the web process:
+# object storage (e.g. 'storages.backends.s3.S3Storage' from django-storages) or a MEDIA_ROOT volume shared by both
+MEDIA_STORAGE_BACKEND = os.getenv('MEDIA_STORAGE_BACKEND', 'django.core.files.storage.FileSystemStorage')
+MEDIA_ROOT_SHARED = os.getenv('MEDIA_ROOT_SHARED', 'false').lower() == 'true'
+STORAGES = {
+    'default': {'BACKEND': MEDIA_STORAGE_BACKEND},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# 'X-Accel-Redirect' (nginx) or 'X-Sendfile' (Apache / lighttpd) to let the front server send media files
+MEDIA_SENDFILE_HEADER = os.getenv('MEDIA_SENDFILE_HEADER', '')
+# nginx `internal` location that maps to MEDIA_ROOT, used with X-Accel-Redirect
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Cache lifetime (seconds) for media files whose name is not content-hashed
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', '3600'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -142,6 +159,76 @@ LOGOUT_REDIRECT_URL = 'login'
 # PAYSTACK PAYMENT SETTINGS
 PAYSTACK_PUBLIC_KEY = os.environ['PK_PUBLIC_KEY']
 PAYSTACK_SECRET_KEY = os.environ['PK_SECRET_KEY']
+PAYSTACK_BASE_URL = os.getenv('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+
+# Gateway client limits, so a slow Paystack cannot hold a worker forever
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv('PAYSTACK_CONNECT_TIMEOUT', '3.05'))
+PAYSTACK_READ_TIMEOUT = float(os.getenv('PAYSTACK_READ_TIMEOUT', '10'))
+PAYSTACK_POOL_SIZE = int(os.getenv('PAYSTACK_POOL_SIZE', '10'))
+PAYSTACK_VERIFY_RETRIES = int(os.getenv('PAYSTACK_VERIFY_RETRIES', '2'))
+PAYSTACK_RETRY_BACKOFF = float(os.getenv('PAYSTACK_RETRY_BACKOFF', '0.5'))
+PAYSTACK_BREAKER_THRESHOLD = int(os.getenv('PAYSTACK_BREAKER_THRESHOLD', '5'))
+PAYSTACK_BREAKER_RESET = float(os.getenv('PAYSTACK_BREAKER_RESET', '30'))
+
+# Async payment views (app.async_views) for ASGI deployments: uvicorn consultant_web.asgi:application
+ASYNC_PAYMENTS = os.getenv('ASYNC_PAYMENTS', 'false').lower() == 'true'
+# Connections shared by all coroutines of a worker, so it is higher than the thread pool above
+PAYSTACK_ASYNC_POOL_SIZE = int(os.getenv('PAYSTACK_ASYNC_POOL_SIZE', '100'))
+
+
+# BOOKING WINDOWS (app.timeslots)
+# Days with working hours are booked in windows of this length
+BOOKING_WINDOW_MINUTES = int(os.getenv('BOOKING_WINDOW_MINUTES', '30'))
+# Earliest-available matching answers are cached this long (seconds) per specialization and dates
+MATCH_CACHE_TIMEOUT = int(os.getenv('MATCH_CACHE_TIMEOUT', '30'))
+
+
+# DASHBOARD EVENTS (app.events, needs an ASGI server)
+EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', '15'))      # seconds between keep-alive comments
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '100'))     # events buffered per stream before it is dropped
+EVENTS_RETRY_MS = int(os.getenv('EVENTS_RETRY_MS', '5000'))        # browser reconnect delay
+
+
+# EXPORTS (app.exports, manage.py export_records)
+# Rows fetched per round-trip while streaming an export
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+
+# ADMIN
+# Unfiltered changelists of tables Postgres estimates above this many rows show that estimate instead of COUNT(*)
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('ADMIN_EXACT_COUNT_LIMIT', '10000'))
+
+
+# BACKGROUND JOBS (manage.py run_worker)
+JOBS_CONCURRENCY = int(os.getenv('JOBS_CONCURRENCY', '4'))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '1'))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '5'))
+JOBS_RETRY_BACKOFF = float(os.getenv('JOBS_RETRY_BACKOFF', '10'))     # seconds, doubled on every retry
+JOBS_STALE_AFTER = int(os.getenv('JOBS_STALE_AFTER', '600'))
+
+
+# CACHE (app.caching)
+# locmem keeps a separate cache per gunicorn worker; point CACHE_BACKEND at
+# django.core.cache.backends.redis.RedisCache (or memcached) to share one
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'consultant-web'),
+    }
+}
+CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', '300'))
+CACHE_STALE_GRACE = int(os.getenv('CACHE_STALE_GRACE', '60'))      # seconds an expired entry may still be served during a rebuild
+CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', '30'))
+CACHE_LOCK_WAIT = float(os.getenv('CACHE_LOCK_WAIT', '2'))
+
+
+# METRICS (/metrics, Prometheus text format)
+# Every gunicorn worker writes its totals here, so keep it on a disk shared by the workers
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'consultant_web_metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# Files of workers that are gone, or that have not written for this long (seconds), are dropped from the sum
+METRICS_STALE_AFTER = float(os.getenv('METRICS_STALE_AFTER', '3600'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
 
 
 REST_FRAMEWORK = {
@@ -150,6 +237,22 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# SESSIONS AND FLASH MESSAGES
+# db:             the session row is read on every request (Django's default)
+# cached_db:      read from CACHES, written through to the database; needs a
+#                 shared CACHE_BACKEND (Redis / memcached), not per-worker locmem
+# signed_cookies: the session lives in the signed cookie, no storage at all
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'app.sessions',
+}
+SESSION_MODE = os.getenv('SESSION_MODE', 'db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# Flash messages ride in their own cookie instead of being saved into the session
+MESSAGE_STORAGE = os.getenv('MESSAGE_STORAGE', 'django.contrib.messages.storage.cookie.CookieStorage')
+
 MESSAGE_TAGS = {
     messages.DEBUG: 'info',
     messages.INFO: 'info',
@@ -0,0 +1,125 @@
+// Live updates for the consultant dashboard: listens to the server-sent
+// events of app.events and patches the booking table in place.
+(function () {
+    var rows = document.getElementById('booking-rows');
+    if (!rows || !window.EventSource) {
+        return;
+    }
+
+    var choices = JSON.parse(document.getElementById('booking-status-choices').textContent);
+    var filters = {
+        status: rows.dataset.statusFilter,
+        dateFrom: rows.dataset.dateFrom,
+        dateTo: rows.dataset.dateTo,
+    };
+
+    function statusClasses(status) {
+        if (status === 'pending') {
+            return 'border-warning text-warning-emphasis';
+        }
+        if (status === 'cancelled') {
+            return 'border-danger text-danger';
+        }
+        return 'border-success text-success';
+    }
+
+    function setStatus(select, status) {
+        select.value = status;
+        select.className = 'form-select form-select-sm shadow-sm booking-status ' + statusClasses(status);
+    }
+
+    function element(tag, attrs, children) {
+        var node = document.createElement(tag);
+        Object.keys(attrs || {}).forEach(function (name) {
+            node.setAttribute(name, attrs[name]);
+        });
+        (children || []).forEach(function (child) {
+            node.append(child);
+        });
+        return node;
+    }
+
+    function csrfInput() {
+        return element('input', {type: 'hidden', name: 'csrfmiddlewaretoken', value: rows.dataset.csrf});
+    }
+
+    function bookingUrl(template, id) {
+        return template.replace('/0/', '/' + id + '/');
+    }
+
+    function matchesFilters(booking) {
+        // Mirrors the GET filters of the page, and only the newest page takes new rows
+        return !rows.dataset.paged
+            && (!filters.status || filters.status === booking.status)
+            && (!filters.dateFrom || booking.date >= filters.dateFrom)
+            && (!filters.dateTo || booking.date <= filters.dateTo);
+    }
+
+    function buildRow(booking) {
+        var select = element('select', {name: 'status'}, choices.map(function (choice) {
+            return element('option', {value: choice[0]}, [choice[1]]);
+        }));
+        select.addEventListener('change', function () {
+            select.form.submit();
+        });
+        setStatus(select, booking.status);
+
+        var statusForm = element('form', {action: bookingUrl(rows.dataset.statusUrl, booking.id), method: 'POST'}, [csrfInput(), select]);
+        var linkForm = element('form', {action: bookingUrl(rows.dataset.linkUrl, booking.id), method: 'POST', class: 'd-flex gap-1'}, [
+            csrfInput(),
+            element('input', {
+                type: 'url', name: 'meeting_link', value: booking.meeting_link, placeholder: 'Enter Meeting Link',
+                class: 'form-control form-control-sm border-primary-subtle',
+            }),
+            element('button', {type: 'submit', class: 'btn btn-sm btn-primary', title: 'Save Link'}, ['Send']),
+        ]);
+
+        var created = new Date(booking.created_at).toLocaleString(undefined, {dateStyle: 'medium', timeStyle: 'short'});
+        return element('tr', {id: 'booking-' + booking.id, class: 'table-info'}, [
+            element('td', {class: 'fw-bold'}, [booking.client]),
+            element('td', {}, [booking.reason]),
+            element('td', {}, [created]),
+            element('td', {}, [statusForm]),
+            element('td', {}, [linkForm]),
+        ]);
+    }
+
+    function bumpTotal() {
+        var total = document.getElementById('booking-total');
+        if (total) {
+            total.textContent = (parseInt(total.textContent, 10) + 1) + ' Total Sessions';
+        }
+    }
+
+    var source = new EventSource(rows.dataset.eventsUrl);
+
+    source.addEventListener('booking-created', function (event) {
+        var booking = JSON.parse(event.data);
+        if (document.getElementById('booking-' + booking.id) || !matchesFilters(booking)) {
+            return;
+        }
+        var empty = document.getElementById('booking-empty');
+        if (empty) {
+            empty.remove();
+        }
+        rows.prepend(buildRow(booking));
+        bumpTotal();
+    });
+
+    source.addEventListener('status-changed', function (event) {
+        var change = JSON.parse(event.data);
+        var row = document.getElementById('booking-' + change.id);
+        var select = row && row.querySelector('.booking-status');
+        if (select) {
+            setStatus(select, change.status);
+        }
+    });
+
+    source.addEventListener('payment-succeeded', function (event) {
+        var payment = JSON.parse(event.data);
+        var row = document.getElementById('booking-' + payment.id);
+        if (row && !row.querySelector('.booking-paid')) {
+            row.querySelector('.booking-status').after(element('span', {class: 'badge bg-success mt-1 booking-paid'}, ['Paid']));
+        }
+    });
+})();